@@ -17,7 +17,7 @@ docker run --rm \
   --entrypoint /bin/bash \
   -v "$BUILD_DIR:/var/task" \
   public.ecr.aws/lambda/python:3.14 \
-  -lc 'pip install -t /var/task "psycopg[binary]"'
+  -lc 'pip install -t /var/task "psycopg[binary]" orjson'
 
 echo "• Copying Lambda handler and app code"
 cp "$ROOT_DIR/services/api/lambdas/api_handler.py" "$BUILD_DIR/"
@@ -5,9 +5,18 @@ async function main() {
   const API_BASE = process.env.NEXT_PUBLIC_API_BASE;
   const baseUrl = process.env.NEXT_PUBLIC_SITE_URL || "https://yourdomain.com";
 
-  // 1) Fetch all products
-  const res = await fetch(`${API_BASE}/catalog/products`);
-  const { items } = await res.json();
+  // 1) Fetch all products, following next_cursor until the last page
+  const items = [];
+  let cursor = null;
+  do {
+    const qs = new URLSearchParams({ limit: "100" });
+    if (cursor) qs.set("cursor", cursor);
+    const res = await fetch(`${API_BASE}/catalog/products?${qs}`);
+    if (!res.ok) throw new Error(`catalog request failed: ${res.status}`);
+    const page = await res.json();
+    items.push(...page.items);
+    cursor = page.next_cursor;
+  } while (cursor);
 
   // 2) Build URL list
   const urls = [
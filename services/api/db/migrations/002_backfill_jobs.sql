@@ -0,0 +1,11 @@
+-- Progress of long-running, resumable backfills (one row per job)
+CREATE TABLE IF NOT EXISTS backfill_jobs (
+  id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+  kind text NOT NULL,
+  status text NOT NULL DEFAULT 'running' CHECK (status IN ('running','done')),
+  last_item_id uuid NULL,
+  scanned bigint NOT NULL DEFAULT 0,
+  updated bigint NOT NULL DEFAULT 0,
+  created_at timestamptz NOT NULL DEFAULT now(),
+  updated_at timestamptz NOT NULL DEFAULT now()
+);
@@ -0,0 +1,38 @@
+-- Latest ingredient list per product, kept current by trigger so readers can
+-- join it directly instead of computing MAX(version) / DISTINCT ON per request.
+ALTER TABLE products
+  ADD COLUMN IF NOT EXISTS latest_ingredient_list_id uuid NULL;
+
+CREATE INDEX IF NOT EXISTS idx_products_latest_list
+  ON products (latest_ingredient_list_id);
+
+CREATE OR REPLACE FUNCTION refresh_latest_ingredient_list(pid uuid) RETURNS void AS $$
+  UPDATE products p
+  SET latest_ingredient_list_id = (
+    SELECT il.id
+    FROM product_ingredient_lists il
+    WHERE il.product_id = pid
+    ORDER BY il.version DESC
+    LIMIT 1
+  )
+  WHERE p.id = pid;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION trg_ingredient_lists_latest() RETURNS trigger AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    PERFORM refresh_latest_ingredient_list(OLD.product_id);
+  END IF;
+  IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND NEW.product_id <> OLD.product_id) THEN
+    PERFORM refresh_latest_ingredient_list(NEW.product_id);
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER ingredient_lists_latest
+  AFTER INSERT OR UPDATE OF product_id, version OR DELETE ON product_ingredient_lists
+  FOR EACH ROW EXECUTE FUNCTION trg_ingredient_lists_latest();
+
+-- Existing rows are filled in by the chunked "latest_ingredient_list" step of
+-- /admin/migrate (app.ingredients.backfill), not here.
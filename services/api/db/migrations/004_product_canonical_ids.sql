@@ -0,0 +1,80 @@
+-- Canonical ingredient set of each product's latest ingredient list, so exclusion
+-- search is a single array-overlap test instead of a join per candidate product.
+-- Requires 001 (items.canonical_id) and 003 (products.latest_ingredient_list_id).
+ALTER TABLE products
+  ADD COLUMN IF NOT EXISTS canonical_ids uuid[] NOT NULL DEFAULT '{}';
+
+CREATE INDEX IF NOT EXISTS idx_products_canonical_ids
+  ON products USING gin (canonical_ids);
+
+CREATE OR REPLACE FUNCTION product_canonical_ids(list_id uuid) RETURNS uuid[] AS $$
+  SELECT coalesce(array_agg(DISTINCT pi.canonical_id ORDER BY pi.canonical_id), '{}')
+  FROM product_ingredient_items pi
+  WHERE pi.ingredient_list_id = list_id
+    AND pi.canonical_id IS NOT NULL;
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION refresh_product_canonical_ids(list_ids uuid[]) RETURNS void AS $$
+  UPDATE products p
+  SET canonical_ids = x.ids
+  FROM (
+    SELECT id, product_canonical_ids(latest_ingredient_list_id) AS ids
+    FROM products
+    WHERE latest_ingredient_list_id = ANY(list_ids)
+  ) x
+  WHERE p.id = x.id
+    AND p.canonical_ids IS DISTINCT FROM x.ids;
+$$ LANGUAGE sql;
+
+-- Products: recompute when the latest list changes
+CREATE OR REPLACE FUNCTION trg_products_canonical_ids() RETURNS trigger AS $$
+BEGIN
+  NEW.canonical_ids := product_canonical_ids(NEW.latest_ingredient_list_id);
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER products_canonical_ids
+  BEFORE INSERT OR UPDATE OF latest_ingredient_list_id ON products
+  FOR EACH ROW EXECUTE FUNCTION trg_products_canonical_ids();
+
+-- Items: statement-level so bulk backfills refresh each affected product once
+CREATE OR REPLACE FUNCTION trg_items_canonical_ids() RETURNS trigger AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    PERFORM refresh_product_canonical_ids(ARRAY(SELECT DISTINCT ingredient_list_id FROM new_rows));
+  ELSIF TG_OP = 'DELETE' THEN
+    PERFORM refresh_product_canonical_ids(ARRAY(SELECT DISTINCT ingredient_list_id FROM old_rows));
+  ELSE
+    PERFORM refresh_product_canonical_ids(ARRAY(
+      SELECT n.ingredient_list_id
+      FROM new_rows n JOIN old_rows o ON o.id = n.id
+      WHERE n.canonical_id IS DISTINCT FROM o.canonical_id
+         OR n.ingredient_list_id <> o.ingredient_list_id
+      UNION
+      SELECT o.ingredient_list_id
+      FROM new_rows n JOIN old_rows o ON o.id = n.id
+      WHERE n.ingredient_list_id <> o.ingredient_list_id
+    ));
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER items_canonical_ids_ins
+  AFTER INSERT ON product_ingredient_items
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION trg_items_canonical_ids();
+
+CREATE OR REPLACE TRIGGER items_canonical_ids_upd
+  AFTER UPDATE ON product_ingredient_items
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION trg_items_canonical_ids();
+
+CREATE OR REPLACE TRIGGER items_canonical_ids_del
+  AFTER DELETE ON product_ingredient_items
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION trg_items_canonical_ids();
+
+-- Existing rows are filled in by the chunked "product_canonical_ids" step of
+-- /admin/migrate (app.ingredients.backfill), not here.
@@ -0,0 +1,7 @@
+-- Keyset pagination over (brand name, product name, id). The cursor's
+-- b.name >= ? bound seeks in the unique brands.name index; this index then walks
+-- each brand's active products in page order. A deep page costs one scan of the
+-- cursor's brand plus the page, not every earlier brand.
+CREATE INDEX IF NOT EXISTS idx_products_active_brand_name_id
+  ON products (brand_id, name, id)
+  WHERE is_active = true;
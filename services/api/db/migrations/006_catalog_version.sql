@@ -0,0 +1,32 @@
+-- Single-row counter bumped by every catalog write, so warm containers can tell
+-- whether cached catalog responses are still current with one cheap query.
+CREATE TABLE IF NOT EXISTS catalog_version (
+  id boolean PRIMARY KEY DEFAULT true CHECK (id),
+  version bigint NOT NULL DEFAULT 0,
+  updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+INSERT INTO catalog_version (id) VALUES (true) ON CONFLICT DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_catalog_version() RETURNS trigger AS $$
+BEGIN
+  UPDATE catalog_version SET version = version + 1, updated_at = now();
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statement-level, so a bulk write bumps the version once
+DO $$
+DECLARE t text;
+BEGIN
+  FOREACH t IN ARRAY ARRAY[
+    'brands', 'products', 'product_ingredient_lists', 'product_ingredient_items',
+    'ingredient_canonical', 'ingredient_synonyms', 'ingredient_hierarchy'
+  ] LOOP
+    EXECUTE format(
+      'CREATE OR REPLACE TRIGGER %I AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I '
+      'FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version()',
+      t || '_bump_catalog_version', t
+    );
+  END LOOP;
+END $$;
@@ -0,0 +1,4 @@
+-- Cached raw item -> canonical resolutions are only valid for the synonym rule set
+-- they were made with; rows with another rules_version are ignored by readers.
+ALTER TABLE ingredient_item_canonical_map
+  ADD COLUMN IF NOT EXISTS rules_version text NULL;
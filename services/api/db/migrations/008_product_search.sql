@@ -0,0 +1,103 @@
+-- Text search for /catalog/search?q=: a weighted tsvector (product name A, brand
+-- name B, latest ingredient list C) and a short name+brand string for pg_trgm
+-- typo matching. Both are kept current by triggers.
+-- Requires 003 (products.latest_ingredient_list_id).
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+ALTER TABLE products
+  ADD COLUMN IF NOT EXISTS search_tsv tsvector NOT NULL DEFAULT ''::tsvector,
+  ADD COLUMN IF NOT EXISTS search_text text NOT NULL DEFAULT '';
+
+CREATE INDEX IF NOT EXISTS idx_products_search_tsv
+  ON products USING gin (search_tsv);
+
+CREATE INDEX IF NOT EXISTS idx_products_search_text_trgm
+  ON products USING gin (search_text gin_trgm_ops);
+
+CREATE OR REPLACE FUNCTION product_search_tsv(product_name text, bid uuid, list_id uuid) RETURNS tsvector AS $$
+  SELECT
+    setweight(to_tsvector('english', coalesce(product_name, '')), 'A')
+    || setweight(to_tsvector('english', coalesce((SELECT name FROM brands WHERE id = bid), '')), 'B')
+    || setweight(to_tsvector('english', coalesce((
+         SELECT string_agg(pi.raw_text, ' ' ORDER BY pi.order_index)
+         FROM product_ingredient_items pi
+         WHERE pi.ingredient_list_id = list_id
+       ), '')), 'C');
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION product_search_text(product_name text, bid uuid) RETURNS text AS $$
+  SELECT lower(coalesce(product_name, '') || ' ' || coalesce((SELECT name FROM brands WHERE id = bid), ''));
+$$ LANGUAGE sql STABLE;
+
+-- Products: recompute when name, brand or latest list changes
+CREATE OR REPLACE FUNCTION trg_products_search() RETURNS trigger AS $$
+BEGIN
+  NEW.search_tsv := product_search_tsv(NEW.name, NEW.brand_id, NEW.latest_ingredient_list_id);
+  NEW.search_text := product_search_text(NEW.name, NEW.brand_id);
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER products_search
+  BEFORE INSERT OR UPDATE OF name, brand_id, latest_ingredient_list_id ON products
+  FOR EACH ROW EXECUTE FUNCTION trg_products_search();
+
+-- Brands: a rename touches the brand's products, which fires products_search
+CREATE OR REPLACE FUNCTION trg_brands_search() RETURNS trigger AS $$
+BEGIN
+  UPDATE products SET brand_id = brand_id WHERE brand_id = NEW.id;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER brands_search
+  AFTER UPDATE OF name ON brands
+  FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+  EXECUTE FUNCTION trg_brands_search();
+
+-- Items: statement-level, like the canonical_ids triggers in 004
+CREATE OR REPLACE FUNCTION refresh_product_search(list_ids uuid[]) RETURNS void AS $$
+  UPDATE products p
+  SET search_tsv = product_search_tsv(p.name, p.brand_id, p.latest_ingredient_list_id)
+  WHERE p.latest_ingredient_list_id = ANY(list_ids);
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION trg_items_search() RETURNS trigger AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    PERFORM refresh_product_search(ARRAY(SELECT DISTINCT ingredient_list_id FROM new_rows));
+  ELSIF TG_OP = 'DELETE' THEN
+    PERFORM refresh_product_search(ARRAY(SELECT DISTINCT ingredient_list_id FROM old_rows));
+  ELSE
+    PERFORM refresh_product_search(ARRAY(
+      SELECT n.ingredient_list_id
+      FROM new_rows n JOIN old_rows o ON o.id = n.id
+      WHERE n.raw_text IS DISTINCT FROM o.raw_text
+         OR n.ingredient_list_id <> o.ingredient_list_id
+      UNION
+      SELECT o.ingredient_list_id
+      FROM new_rows n JOIN old_rows o ON o.id = n.id
+      WHERE n.ingredient_list_id <> o.ingredient_list_id
+    ));
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER items_search_ins
+  AFTER INSERT ON product_ingredient_items
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION trg_items_search();
+
+CREATE OR REPLACE TRIGGER items_search_upd
+  AFTER UPDATE ON product_ingredient_items
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION trg_items_search();
+
+CREATE OR REPLACE TRIGGER items_search_del
+  AFTER DELETE ON product_ingredient_items
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION trg_items_search();
+
+-- Existing rows are filled in by the chunked "product_search" step of
+-- /admin/migrate (app.ingredients.backfill), not here.
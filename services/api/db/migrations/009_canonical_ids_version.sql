@@ -0,0 +1,50 @@
+-- Counter for the inputs of the similar-products index only: which products are
+-- active and their canonical_ids. catalog_version moves on every catalog write;
+-- this one moves only when a rebuilt index could differ.
+ALTER TABLE catalog_version
+  ADD COLUMN IF NOT EXISTS canonical_ids_version bigint NOT NULL DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION bump_canonical_ids_version() RETURNS trigger AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    IF NOT EXISTS (SELECT 1 FROM new_rows WHERE is_active AND cardinality(canonical_ids) > 0) THEN
+      RETURN NULL;
+    END IF;
+  ELSIF TG_OP = 'DELETE' THEN
+    IF NOT EXISTS (SELECT 1 FROM old_rows WHERE is_active AND cardinality(canonical_ids) > 0) THEN
+      RETURN NULL;
+    END IF;
+  ELSIF TG_OP = 'UPDATE' THEN
+    IF NOT EXISTS (
+      SELECT 1
+      FROM new_rows n JOIN old_rows o ON o.id = n.id
+      WHERE n.canonical_ids IS DISTINCT FROM o.canonical_ids
+         OR n.is_active IS DISTINCT FROM o.is_active
+    ) THEN
+      RETURN NULL;
+    END IF;
+  END IF;
+  UPDATE catalog_version SET canonical_ids_version = canonical_ids_version + 1;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statement-level with transition tables, like the canonical_ids triggers in 004
+CREATE OR REPLACE TRIGGER products_canonical_ids_version_ins
+  AFTER INSERT ON products
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION bump_canonical_ids_version();
+
+CREATE OR REPLACE TRIGGER products_canonical_ids_version_upd
+  AFTER UPDATE ON products
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION bump_canonical_ids_version();
+
+CREATE OR REPLACE TRIGGER products_canonical_ids_version_del
+  AFTER DELETE ON products
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION bump_canonical_ids_version();
+
+CREATE OR REPLACE TRIGGER products_canonical_ids_version_truncate
+  AFTER TRUNCATE ON products
+  FOR EACH STATEMENT EXECUTE FUNCTION bump_canonical_ids_version();
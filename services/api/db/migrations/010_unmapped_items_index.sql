@@ -0,0 +1,4 @@
+-- Keyset scan for the canonical backfill (only rows still to be resolved)
+CREATE INDEX IF NOT EXISTS idx_pii_unmapped_id
+  ON product_ingredient_items (id)
+  WHERE canonical_id IS NULL;
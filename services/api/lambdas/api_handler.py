@@ -1,5 +1,6 @@
-import json
-from app.main import handle_request
+from app.main import handle_request, init
+
+init()
 
 
 def lambda_handler(event, context):
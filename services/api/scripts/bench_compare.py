@@ -0,0 +1,131 @@
+"""
+Presence counting for compare: per-product sets + dict counters + two sorts (what
+app.compare.service._compute does) vs. int bitsets over product positions, the
+alternative that was measured and not adopted. Re-run it before revisiting that.
+
+  PYTHONPATH=src python scripts/bench_compare.py [--products 50 --ingredients 100]
+
+Ingredients are drawn from a shared pool so that products overlap the way real
+formulas do (a handful of staples in nearly everything, a long tail).
+"""
+import argparse
+import random
+import time
+from collections import defaultdict
+
+
+def count_with_sets(keys_by_product):
+    counts = defaultdict(int)
+    for keys in keys_by_product:
+        seen = set()
+        for key in keys:
+            if key not in seen:
+                seen.add(key)
+                counts[key] += 1
+    return counts
+
+
+def rank_with_sets(keys_by_product, display):
+    counts = count_with_sets(keys_by_product)
+    total = len(keys_by_product)
+    scored = [
+        {"ingredient": display.get(k, k), "ingredient_key": k, "in_count": c,
+         "percent": round(c / total, 4)}
+        for k, c in counts.items()
+    ]
+    in_all = sorted([x for x in scored if x["in_count"] == total],
+                    key=lambda x: x["ingredient"].lower())
+    in_some = sorted([x for x in scored if 0 < x["in_count"] < total],
+                     key=lambda x: (-x["in_count"], x["ingredient"].lower()))
+    return in_all, in_some
+
+
+def count_with_bitsets(keys_by_product):
+    # Dense ordinal per key, and an int with bit i set when product i has it
+    ordinals = {}
+    masks = []
+    for idx, keys in enumerate(keys_by_product):
+        bit = 1 << idx
+        for key in keys:
+            o = ordinals.get(key)
+            if o is None:
+                o = ordinals[key] = len(masks)
+                masks.append(bit)
+            else:
+                masks[o] |= bit
+    return ordinals, masks
+
+
+def rank_with_bitsets(keys_by_product, display):
+    ordinals, masks = count_with_bitsets(keys_by_product)
+    total = len(keys_by_product)
+    # One sort: in_all entries have the top count, so they form a name-ordered prefix
+    ranked = sorted(
+        ((masks[o].bit_count(), display.get(k, k), k) for k, o in ordinals.items()),
+        key=lambda x: (-x[0], x[1].lower()),
+    )
+    scored = [
+        {"ingredient": disp, "ingredient_key": k, "in_count": c, "percent": round(c / total, 4)}
+        for c, disp, k in ranked
+    ]
+    split = 0
+    while split < len(scored) and scored[split]["in_count"] == total:
+        split += 1
+    return scored[:split], scored[split:]
+
+
+def make_products(n_products, n_ingredients, pool, rng):
+    staples = [f"ing{i}" for i in range(5)]
+    weights = [1 / (i + 1) for i in range(pool)]
+    universe = [f"ing{i}" for i in range(pool)]
+    products = []
+    for _ in range(n_products):
+        keys = list(staples)
+        keys += rng.choices(universe, weights=weights, k=n_ingredients - len(staples))
+        products.append(keys)
+    display = {k: k.capitalize() for k in universe}
+    return products, display
+
+
+def bench(fn, args, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn(*args)
+    return (time.perf_counter() - t0) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=50)
+    parser.add_argument("--ingredients", type=int, default=100)
+    parser.add_argument("--pool", type=int, default=1500)
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    products, display = make_products(args.products, args.ingredients, args.pool, rng)
+
+    # Counting only, then counting + ranking into the response shape
+    sets_count_us = bench(count_with_sets, (products,), args.repeat)
+    bits_count_us = bench(count_with_bitsets, (products,), args.repeat)
+    sets_us = bench(rank_with_sets, (products, display), args.repeat)
+    bits_us = bench(rank_with_bitsets, (products, display), args.repeat)
+
+    mismatches = int(rank_with_sets(products, display) != rank_with_bitsets(products, display))
+    for _ in range(200):
+        sample, d = make_products(rng.randint(2, 8), rng.randint(5, 30), 40, rng)
+        mismatches += int(rank_with_sets(sample, d) != rank_with_bitsets(sample, d))
+
+    in_all, in_some = rank_with_sets(products, display)
+    print(f"products={args.products} ingredients/product={args.ingredients} "
+          f"distinct={len(in_all) + len(in_some)} in_all={len(in_all)}")
+    print(f"count only:   sets {sets_count_us:.1f} us, bitsets {bits_count_us:.1f} us "
+          f"({sets_count_us / bits_count_us:.2f}x)")
+    print(f"count + rank: sets {sets_us:.1f} us, bitsets {bits_us:.1f} us "
+          f"({sets_us / bits_us:.2f}x)")
+    print(f"mismatches: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
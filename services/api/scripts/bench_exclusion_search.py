@@ -0,0 +1,139 @@
+"""
+Exclusion-search latency before/after products.latest_ingredient_list_id.
+
+  PYTHONPATH=src python scripts/bench_exclusion_search.py [--products 100000]
+
+Builds a synthetic catalog in a throwaway schema (bench_latest_list), times the
+old correlated MAX(version) query and the new direct join, then drops the
+schema. Needs the usual DB_* environment.
+"""
+import argparse
+import statistics
+import time
+from pathlib import Path
+
+from app.db import get_conn
+
+SCHEMA = "bench_latest_list"
+DB_DIR = Path(__file__).resolve().parents[1] / "db"
+
+SEED_SQL = [
+    """
+    INSERT INTO brands (name, slug)
+    SELECT 'Brand ' || g, 'brand-' || g FROM generate_series(1, 200) g
+    """,
+    """
+    INSERT INTO ingredient_canonical (name, slug)
+    SELECT 'Ingredient ' || g, 'ingredient-' || g FROM generate_series(1, 500) g
+    """,
+    """
+    INSERT INTO products (brand_id, name, slug, species, format, life_stage)
+    SELECT b.id, 'Product ' || g, 'product-' || g, 'dog', 'dry', 'adult'
+    FROM generate_series(1, %(products)s) g
+    JOIN brands b ON b.slug = 'brand-' || (g %% 200 + 1)
+    """,
+    # Two versions per product; only the latest one should count
+    """
+    INSERT INTO product_ingredient_lists (product_id, version)
+    SELECT p.id, v FROM products p, generate_series(1, 2) v
+    """,
+    """
+    INSERT INTO product_ingredient_items (ingredient_list_id, raw_text, order_index, canonical_id)
+    SELECT il.id, c.name, i, c.id
+    FROM product_ingredient_lists il
+    CROSS JOIN generate_series(0, %(items)s - 1) i
+    JOIN ingredient_canonical c
+      ON c.slug = 'ingredient-' || (abs(hashtext(il.id::text) + i * 7919) %% 500 + 1)::text
+    """,
+    "ANALYZE",
+]
+
+BEFORE_SQL = """
+  SELECT p.id
+  FROM products p
+  JOIN brands b ON b.id = p.brand_id
+  WHERE p.is_active = true AND p.species = 'dog'
+    AND NOT EXISTS (
+      SELECT 1
+      FROM product_ingredient_lists il
+      JOIN product_ingredient_items pi ON pi.ingredient_list_id = il.id
+      WHERE il.product_id = p.id
+        AND il.version = (SELECT MAX(version) FROM product_ingredient_lists WHERE product_id = p.id)
+        AND pi.canonical_id = ANY(%s::uuid[])
+    )
+  ORDER BY b.name, p.name
+  LIMIT 25
+"""
+
+AFTER_SQL = """
+  SELECT p.id
+  FROM products p
+  JOIN brands b ON b.id = p.brand_id
+  WHERE p.is_active = true AND p.species = 'dog'
+    AND NOT EXISTS (
+      SELECT 1
+      FROM product_ingredient_items pi
+      WHERE pi.ingredient_list_id = p.latest_ingredient_list_id
+        AND pi.canonical_id = ANY(%s::uuid[])
+    )
+  ORDER BY b.name, p.name
+  LIMIT 25
+"""
+
+
+def _time(cur, sql, params, runs):
+    cur.execute(sql, params)  # warm-up
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        cur.execute(sql, params)
+        cur.fetchall()
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--items", type=int, default=12)
+    parser.add_argument("--runs", type=int, default=30)
+    args = parser.parse_args()
+
+    with get_conn() as conn:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            try:
+                cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+                cur.execute(f"CREATE SCHEMA {SCHEMA}")
+                cur.execute(f"SET search_path = {SCHEMA}, public")
+                cur.execute((DB_DIR / "schema.sql").read_text())
+                cur.execute((DB_DIR / "migrations/001_add_canonical_id.sql").read_text())
+
+                t0 = time.perf_counter()
+                for stmt in SEED_SQL:
+                    cur.execute(stmt, {"products": args.products, "items": args.items})
+                print(f"seeded {args.products} products in {time.perf_counter() - t0:.1f} s")
+
+                cur.execute(
+                    "SELECT array_agg(id) FROM (SELECT id FROM ingredient_canonical LIMIT 3) c"
+                )
+                exclude = [str(x) for x in cur.fetchone()[0]]
+
+                before = _time(cur, BEFORE_SQL, (exclude,), args.runs)
+                cur.execute((DB_DIR / "migrations/003_latest_ingredient_list.sql").read_text())
+                cur.execute("ANALYZE products")
+                after = _time(cur, AFTER_SQL, (exclude,), args.runs)
+
+                print(f"before (MAX(version) subquery): "
+                      f"p50 {before[0]:.1f} ms  p95 {before[1]:.1f} ms")
+                print(f"after  (latest_ingredient_list_id): "
+                      f"p50 {after[0]:.1f} ms  p95 {after[1]:.1f} ms")
+            finally:
+                cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+                cur.execute("RESET search_path")
+        conn.autocommit = False
+
+
+if __name__ == "__main__":
+    main()
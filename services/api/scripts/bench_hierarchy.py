@@ -0,0 +1,91 @@
+"""
+Closure build and lookup cost on a synthetic 5-level, ~10k-node taxonomy.
+
+  PYTHONPATH=src python scripts/bench_hierarchy.py [--nodes 10000]
+
+The baseline walks parent/child maps per request, which is what a recursive CTE
+would do on every search.
+"""
+import argparse
+import random
+import time
+from collections import defaultdict, deque
+
+from app.ingredients.hierarchy import Closure
+
+
+def make_taxonomy(nodes, levels, rng):
+    # Level sizes grow geometrically; ~5% of nodes get a second parent (DAG).
+    ratio = nodes ** (1 / (levels - 1))
+    sizes = [max(1, round(ratio ** i)) for i in range(levels)]
+    level_ids, edges, n = [], [], 0
+    for size in sizes:
+        level_ids.append([f"n{n + i}" for i in range(size)])
+        n += size
+    for upper, lower in zip(level_ids, level_ids[1:]):
+        for child in lower:
+            edges.append((rng.choice(upper), child))
+            if rng.random() < 0.05:
+                edges.append((rng.choice(upper), child))
+    return edges, [x for ids in level_ids for x in ids]
+
+
+def expand_by_walk(ids, parents, children):
+    out = set(ids)
+    for start in ids:
+        for graph in (parents, children):
+            seen = {start}
+            queue = deque([start])
+            while queue:
+                for nxt in graph.get(queue.popleft(), ()):
+                    if nxt not in seen:
+                        seen.add(nxt)
+                        queue.append(nxt)
+            out |= seen
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, default=10_000)
+    parser.add_argument("--levels", type=int, default=5)
+    parser.add_argument("--lookups", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    edges, all_ids = make_taxonomy(args.nodes, args.levels, rng)
+
+    t0 = time.perf_counter()
+    closure = Closure(edges)
+    build_ms = (time.perf_counter() - t0) * 1000
+
+    queries = [[rng.choice(all_ids) for _ in range(3)] for _ in range(args.lookups)]
+
+    t0 = time.perf_counter()
+    for q in queries:
+        closure.expand(q)
+    closure_us = (time.perf_counter() - t0) / len(queries) * 1e6
+
+    parents, children = defaultdict(set), defaultdict(set)
+    for p, c in edges:
+        parents[c].add(p)
+        children[p].add(c)
+    sample = queries[: max(1, len(queries) // 10)]
+    t0 = time.perf_counter()
+    for q in sample:
+        expand_by_walk(q, parents, children)
+    walk_us = (time.perf_counter() - t0) / len(sample) * 1e6
+
+    mismatches = sum(1 for q in sample[:1000]
+                     if set(closure.expand(q)) != expand_by_walk(q, parents, children))
+    pairs = sum(len(v) for v in closure.ancestors.values())
+
+    print(f"nodes={len(all_ids)} edges={len(edges)} levels={args.levels} closure_pairs={pairs}")
+    print(f"closure build: {build_ms:.1f} ms")
+    print(f"expand 3 ids: closure {closure_us:.1f} us/query, graph walk {walk_us:.1f} us/query")
+    print(f"mismatches: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
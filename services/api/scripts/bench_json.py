@@ -0,0 +1,132 @@
+"""
+Response serialization cost: the old path (str()/isoformat() per row, then
+json.dumps(..., ensure_ascii=False)) vs. app.serialization on raw row values,
+with the stdlib encoder and with orjson.
+
+  PYTHONPATH=src python scripts/bench_json.py [--runs 2000]
+
+Payloads are synthetic: a 25-item search page and a product detail with a
+100-item ingredient list, shaped like the catalog responses.
+"""
+import argparse
+import datetime
+import json
+import random
+import time
+import uuid
+
+from app import serialization
+
+
+def search_rows(n, rng):
+    return [
+        (uuid.UUID(int=rng.getrandbits(128)), f"product-{i}", f"Grain Free Salmon Recipe {i}",
+         "dog", "dry", "adult", uuid.UUID(int=rng.getrandbits(128)), f"brand-{i % 7}",
+         f"Brand Nº{i % 7}", rng.random())
+        for i in range(n)
+    ]
+
+
+def search_old(rows):
+    items = [{
+        "id": str(r[0]), "slug": r[1], "name": r[2], "species": r[3], "format": r[4],
+        "life_stage": r[5], "brand": {"id": str(r[6]), "slug": r[7], "name": r[8]},
+        "score": round(r[9], 4),
+    } for r in rows]
+    return json.dumps({"items": items, "next_cursor": "abc"}, ensure_ascii=False)
+
+
+def search_new(rows, dumps):
+    items = [{
+        "id": r[0], "slug": r[1], "name": r[2], "species": r[3], "format": r[4],
+        "life_stage": r[5], "brand": {"id": r[6], "slug": r[7], "name": r[8]},
+        "score": round(r[9], 4),
+    } for r in rows]
+    return dumps({"items": items, "next_cursor": "abc"})
+
+
+def detail_rows(n, rng):
+    product = (uuid.UUID(int=rng.getrandbits(128)), "salmon-recipe", "Salmon Recipe", "dog", "dry",
+               "adult", True, uuid.UUID(int=rng.getrandbits(128)), "brand", "Brand",
+               uuid.UUID(int=rng.getrandbits(128)), 3, datetime.date(2024, 5, 1), "label",
+               None, None)
+    items = [(uuid.UUID(int=rng.getrandbits(128)), f"ingredient {i} (source of vitamin É)", i,
+              i % 20 == 0, i % 30 == 0) for i in range(n)]
+    return product, items
+
+
+def detail_old(product, items):
+    row, il = product, product[10:]
+    return json.dumps({
+        "id": str(row[0]), "slug": row[1], "name": row[2], "species": row[3], "format": row[4],
+        "life_stage": row[5], "is_active": row[6],
+        "brand": {"id": str(row[7]), "slug": row[8], "name": row[9]},
+        "ingredient_list": {
+            "id": str(il[0]), "version": il[1],
+            "effective_date": il[2].isoformat() if il[2] else None,
+            "source_type": il[3], "source_ref": il[4], "notes": il[5],
+            "items": [{"id": str(r[0]), "raw_text": r[1], "order_index": r[2],
+                       "is_may_contain": r[3], "is_trace": r[4]} for r in items],
+        },
+    }, ensure_ascii=False)
+
+
+def detail_new(product, items, dumps):
+    row, il = product, product[10:]
+    return dumps({
+        "id": row[0], "slug": row[1], "name": row[2], "species": row[3], "format": row[4],
+        "life_stage": row[5], "is_active": row[6],
+        "brand": {"id": row[7], "slug": row[8], "name": row[9]},
+        "ingredient_list": {
+            "id": il[0], "version": il[1], "effective_date": il[2],
+            "source_type": il[3], "source_ref": il[4], "notes": il[5],
+            "items": [{"id": r[0], "raw_text": r[1], "order_index": r[2],
+                       "is_may_contain": r[3], "is_trace": r[4]} for r in items],
+        },
+    })
+
+
+def _run(fn, runs):
+    fn()
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - start) / runs * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=2000)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    rows = search_rows(25, rng)
+    product, items = detail_rows(100, rng)
+
+    backends = [("stdlib", serialization._ENCODER.encode)]
+    if serialization.orjson is not None:
+        backends.append(("orjson", serialization._orjson_dumps))
+
+    for name, dumps in backends:
+        assert json.loads(search_new(rows, dumps)) == json.loads(search_old(rows))
+        assert (json.loads(detail_new(product, items, dumps))
+                == json.loads(detail_old(product, items)))
+
+    print(f"{'payload':<22} {'path':<10} {'us/op':>9} {'speedup':>8}")
+    for label, old, new in (
+        ("search (25 items)", lambda: search_old(rows), lambda d: lambda: search_new(rows, d)),
+        ("detail (100 items)", lambda: detail_old(product, items),
+         lambda d: lambda: detail_new(product, items, d)),
+    ):
+        base = _run(old, args.runs)
+        print(f"{label:<22} {'old':<10} {base:9.1f} {1.0:7.2f}x")
+        for name, dumps in backends:
+            us = _run(new(dumps), args.runs)
+            print(f"{label:<22} {name:<10} {us:9.1f} {base / us:7.2f}x")
+    if serialization.orjson is None:
+        print("\norjson not installed; only the stdlib backend was measured")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Product detail latency: Python dict building + json.dumps vs. Postgres json_agg.
+
+  PYTHONPATH=src python scripts/bench_product_detail.py [--token SLUG] [--runs 500]
+
+Without --token, uses the product whose latest list has the most items (the
+comparison is meant for products with 80+ ingredients).
+"""
+import argparse
+import json
+import time
+
+from app.catalog.product_detail import get_product_by_id_or_slug, get_product_json_by_id_or_slug
+from app.db import get_conn
+
+LARGEST_SQL = """
+  SELECT p.slug, count(*)
+  FROM products p
+  JOIN product_ingredient_items pi ON pi.ingredient_list_id = p.latest_ingredient_list_id
+  GROUP BY p.slug
+  ORDER BY count(*) DESC
+  LIMIT 1
+"""
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2], samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+
+def _run(fn, runs):
+    fn()  # warm-up (pool, plan cache)
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return _percentiles(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--token")
+    parser.add_argument("--runs", type=int, default=500)
+    args = parser.parse_args()
+
+    token = args.token
+    if not token:
+        with get_conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute(LARGEST_SQL)
+                row = cur.fetchone()
+        if not row:
+            raise SystemExit("no products with ingredient lists")
+        token, count = row
+        print(f"using {token} ({count} items)")
+        if count < 80:
+            print("warning: fewer than 80 items; pass --token for a larger product")
+
+    python_path = _run(
+        lambda: json.dumps(get_product_by_id_or_slug(token), ensure_ascii=False), args.runs
+    )
+    json_agg_path = _run(lambda: get_product_json_by_id_or_slug(token), args.runs)
+
+    print(f"python + json.dumps: p50 {python_path[0]:.2f} ms  p99 {python_path[1]:.2f} ms")
+    print(f"json_agg:            p50 {json_agg_path[0]:.2f} ms  p99 {json_agg_path[1]:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
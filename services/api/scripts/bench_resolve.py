@@ -0,0 +1,87 @@
+"""
+Compare the compiled synonym matcher against the old linear scan.
+
+  PYTHONPATH=src python scripts/bench_resolve.py [--items 100000] [--rules 10000]
+
+The linear scan is timed on a sample and extrapolated; running it on the full
+100k x 10k product takes far too long to be useful.
+"""
+import argparse
+import random
+import time
+
+from app.ingredients.resolve import CompiledRules, SynRule, norm
+
+
+def resolve_linear(raw_text, rules):
+    # Implementation before the compiled matcher, kept here as the baseline
+    t = norm(raw_text)
+    if not t:
+        return None
+    for rule in rules:
+        syn = norm(rule.synonym)
+        if rule.match_type == "exact" and t == syn:
+            return (rule.canonical_id, rule.canonical_name)
+        if rule.match_type == "contains" and syn in t:
+            return (rule.canonical_id, rule.canonical_name)
+    return None
+
+
+def make_rules(n, rng, words):
+    rules = []
+    for i in range(n):
+        syn = " ".join(rng.choice(words) for _ in range(rng.randint(1, 3)))
+        match_type = "exact" if i % 2 == 0 else "contains"
+        rules.append(SynRule(f"c{i}", f"Canonical {i}", syn, match_type))
+    # Same order load_rules() produces
+    rules.sort(key=lambda r: (0 if r.match_type == "exact" else 1, -len(r.synonym)))
+    return rules
+
+
+def make_items(n, rng, words):
+    return [
+        " ".join(rng.choice(words) for _ in range(rng.randint(1, 6))).title()
+        for _ in range(n)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--rules", type=int, default=10_000)
+    parser.add_argument("--linear-sample", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    words = [f"ing{i}" for i in range(3000)] + ["chicken", "meal", "rice", "pea", "protein"]
+    rules = make_rules(args.rules, rng, words)
+    items = make_items(args.items, rng, words)
+
+    t0 = time.perf_counter()
+    compiled = CompiledRules(rules)
+    build_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    compiled_out = [compiled.resolve(x) for x in items]
+    compiled_s = time.perf_counter() - t0
+
+    sample = items[: args.linear_sample]
+    t0 = time.perf_counter()
+    linear_out = [resolve_linear(x, rules) for x in sample]
+    linear_sample_s = time.perf_counter() - t0
+    linear_est_s = linear_sample_s * len(items) / len(sample)
+
+    mismatches = sum(1 for a, b in zip(linear_out, compiled_out) if a != b)
+    matched = sum(1 for x in compiled_out if x)
+
+    print(f"rules={len(rules)} items={len(items)} matched={matched}")
+    print(f"compiled: build {build_s * 1000:.1f} ms, resolve {compiled_s:.2f} s "
+          f"({len(items) / compiled_s:,.0f} items/s)")
+    print(f"linear:   {linear_sample_s:.2f} s for {len(sample)} items, "
+          f"~{linear_est_s:.0f} s extrapolated ({len(sample) / linear_sample_s:,.0f} items/s)")
+    print(f"speedup:  ~{linear_est_s / compiled_s:,.0f}x, mismatches on sample: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
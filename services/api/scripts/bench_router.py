@@ -0,0 +1,87 @@
+"""
+Dispatch cost at 50 routes: an if/elif-style chain of endswith/startswith
+checks (how main.handle_request used to route) vs. app.router.Router.
+
+  PYTHONPATH=src python scripts/bench_router.py [--routes 50]
+
+Requests are spread evenly over all routes plus some 404s, so the chain pays
+its average position rather than best case.
+"""
+import argparse
+import random
+import time
+
+from app.router import Router
+
+
+def make_routes(n, rng):
+    routes = []
+    for i in range(n):
+        if i % 3 == 2:
+            routes.append(("GET", f"/res{i}/{{token}}/items", f"/res{i}/tok{i}/items"))
+        elif i % 3 == 1:
+            routes.append(("POST", f"/res{i}/action{i}", f"/res{i}/action{i}"))
+        else:
+            routes.append(("GET", f"/res{i}/list", f"/res{i}/list"))
+    rng.shuffle(routes)
+    return routes
+
+
+def build_chain(routes):
+    # Ordered (method, predicate) pairs, like an if/elif chain
+    chain = []
+    for method, pattern, _ in routes:
+        if "{token}" in pattern:
+            prefix, suffix = pattern.split("{token}")
+            chain.append(
+                (method, lambda p, pre=prefix, suf=suffix: p.startswith(pre) and p.endswith(suf))
+            )
+        else:
+            chain.append((method, lambda p, s=pattern: p.endswith(s)))
+    return chain
+
+
+def dispatch_chain(chain, method, path):
+    for i, (m, pred) in enumerate(chain):
+        if m == method and pred(path):
+            return i
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--routes", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    routes = make_routes(args.routes, rng)
+
+    router = Router()
+    for i, (method, pattern, _) in enumerate(routes):
+        router.add(method, pattern, lambda req: None, name=f"r{i}")
+    chain = build_chain(routes)
+
+    requests = [(m, example) for m, _, example in routes]
+    requests += [("GET", "/nope/missing"), ("DELETE", routes[0][2])]
+    stream = [rng.choice(requests) for _ in range(args.requests)]
+
+    t0 = time.perf_counter()
+    for method, path in stream:
+        dispatch_chain(chain, method, path)
+    chain_ns = (time.perf_counter() - t0) / len(stream) * 1e9
+
+    t0 = time.perf_counter()
+    for method, path in stream:
+        router.match(method, path)
+    router_ns = (time.perf_counter() - t0) / len(stream) * 1e9
+
+    static = sum(1 for _, p, _ in routes if "{" not in p)
+    print(f"routes={args.routes} ({static} static, {args.routes - static} with parameters)")
+    print(f"if/elif chain: {chain_ns:.0f} ns/request")
+    print(f"route table:   {router_ns:.0f} ns/request ({chain_ns / router_ns:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Allocations and time for turning 10k catalog rows into response dicts: the old
+path (fetchall() into a list of tuples, then a hand-written dict per row) vs.
+app.catalog.rows.product_row, which builds each dict as the row is fetched.
+
+  PYTHONPATH=src python scripts/bench_row_factory.py [--rows 10000] [--runs 20]
+
+No database: a fake cursor yields one fresh tuple per row the way psycopg's
+loaders do, so column values cost the same on both paths and the difference is
+the intermediate rows. Allocations are from tracemalloc (peak traced bytes, and
+live blocks at the point where the fetched rows and the items both exist).
+"""
+import argparse
+import random
+import time
+import tracemalloc
+import uuid
+
+from app.catalog.rows import product_row
+
+COLUMNS = ("id", "slug", "name", "species", "format", "life_stage", "is_active",
+           "brand_id", "brand_slug", "brand_name")
+
+
+class _Column:
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeCursor:
+    def __init__(self, values, row_factory=None):
+        self.description = [_Column(n) for n in COLUMNS]
+        self._values = values
+        self._make_row = row_factory(self) if row_factory else tuple
+
+    def fetchall(self):
+        make_row = self._make_row
+        return [make_row(tuple(v)) for v in self._values]
+
+
+def make_values(n, rng):
+    brands = [(uuid.UUID(int=rng.getrandbits(128)), f"brand-{i}", f"Brand {i}") for i in range(50)]
+    out = []
+    for i in range(n):
+        b = brands[i % len(brands)]
+        out.append([uuid.UUID(int=rng.getrandbits(128)), f"product-{i}", f"Salmon Recipe {i}",
+                    "dog", "dry", "adult", True, *b])
+    return out
+
+
+def old_path(values):
+    rows = FakeCursor(values).fetchall()
+    items = []
+    for r in rows:
+        items.append({
+            "id": r[0],
+            "slug": r[1],
+            "name": r[2],
+            "species": r[3],
+            "format": r[4],
+            "life_stage": r[5],
+            "is_active": r[6],
+            "brand": {"id": r[7], "slug": r[8], "name": r[9]},
+        })
+    return items, tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+
+
+def new_path(values):
+    items = FakeCursor(values, product_row).fetchall()
+    return items, tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+
+
+def measure(fn, values):
+    fn(values)  # warm up outside the trace
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    items, snap = fn(values)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    own = tracemalloc.Filter(False, tracemalloc.__file__)
+    stats = snap.filter_traces([own]).statistics("filename")
+    blocks = sum(s.count for s in stats)
+    return peak, blocks, items
+
+
+def timeit(fn, values, runs):
+    fn(values)
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn(values)
+    return (time.perf_counter() - start) / runs * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=10000)
+    ap.add_argument("--runs", type=int, default=20)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    values = make_values(args.rows, random.Random(args.seed))
+    old_peak, old_blocks, old_items = measure(old_path, values)
+    new_peak, new_blocks, new_items = measure(new_path, values)
+    assert old_items == new_items
+
+    old_ms = timeit(old_path, values, args.runs)
+    new_ms = timeit(new_path, values, args.runs)
+
+    print(f"{args.rows} rows")
+    print(f"{'path':<14} {'peak KiB':>10} {'live blocks':>12} {'ms/fetch':>9}")
+    print(f"{'tuples+dicts':<14} {old_peak / 1024:10.0f} {old_blocks:12d} {old_ms:9.2f}")
+    print(f"{'product_row':<14} {new_peak / 1024:10.0f} {new_blocks:12d} {new_ms:9.2f}")
+    print(f"peak -{100 * (1 - new_peak / old_peak):.0f}%, "
+          f"blocks -{100 * (1 - new_blocks / old_blocks):.0f}%, "
+          f"time {old_ms / new_ms:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
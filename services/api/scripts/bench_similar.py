@@ -0,0 +1,86 @@
+"""
+Similar-products index on a synthetic catalog: build/load cost, LSH lookup
+latency and recall of the exact top-k against a brute-force Jaccard scan.
+
+  PYTHONPATH=src python scripts/bench_similar.py [--products 50000]
+
+Products are generated in "families" (one base recipe with a few swaps) so
+that real near-duplicates exist, as with a brand's flavour variants.
+"""
+import argparse
+import random
+import time
+import uuid
+
+from app.catalog.similar import CANDIDATE_FACTOR, SimilarIndex, jaccard, minhash
+
+
+def make_catalog(n_products, vocab, rng):
+    ingredients = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(vocab)]
+    weights = [1 / (i + 1) ** 0.8 for i in range(vocab)]
+    catalog = []
+    while len(catalog) < n_products:
+        base = set(rng.choices(ingredients, weights=weights, k=rng.randint(15, 40)))
+        for _ in range(rng.randint(1, 8)):
+            variant = set(base)
+            for _ in range(rng.randint(0, 6)):
+                variant.discard(rng.choice(sorted(variant)))
+                variant.add(rng.choice(ingredients))
+            catalog.append((str(uuid.UUID(int=rng.getrandbits(128))), f"product-{len(catalog)}",
+                            sorted(variant)))
+    return catalog[:n_products]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=50_000)
+    parser.add_argument("--vocab", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    catalog = make_catalog(args.products, args.vocab, rng)
+    sets = {pid: ids for pid, _, ids in catalog}
+
+    t0 = time.perf_counter()
+    index = SimilarIndex.from_sets(catalog)
+    build_s = time.perf_counter() - t0
+
+    data = index.to_bytes()
+    t0 = time.perf_counter()
+    SimilarIndex.from_bytes(data)
+    load_s = time.perf_counter() - t0
+
+    queries = rng.sample(catalog, args.queries)
+    lookup_s = 0.0
+    rerank_s = 0.0
+    recall_hits = 0
+    recall_total = 0
+    for product_id, _, ids in queries:
+        t0 = time.perf_counter()
+        candidates = index.candidates(minhash(ids), args.k * CANDIDATE_FACTOR, exclude=product_id)
+        t1 = time.perf_counter()
+        query_set = set(ids)
+        ranked = sorted((jaccard(query_set, sets[c]), c) for c, _ in candidates)[::-1][:args.k]
+        rerank_s += time.perf_counter() - t1
+        lookup_s += t1 - t0
+
+        # Ground truth: products with Jaccard >= 0.5 among the true top-k
+        exact = sorted(((jaccard(query_set, s), pid) for pid, _, s in catalog if pid != product_id),
+                       reverse=True)[:args.k]
+        relevant = {pid for j, pid in exact if j >= 0.5}
+        recall_hits += len(relevant & {c for _, c in ranked})
+        recall_total += len(relevant)
+
+    print(f"products={len(index.ids)} vocab={args.vocab} k={args.k}")
+    print(f"build: {build_s:.1f} s, artifact {len(data) / 1e6:.1f} MB, load {load_s * 1000:.0f} ms")
+    print(f"lookup: {lookup_s / args.queries * 1e6:.0f} us/query, exact re-rank "
+          f"{rerank_s / args.queries * 1e6:.0f} us/query")
+    if recall_total:
+        print(f"recall of true top-{args.k} with Jaccard >= 0.5: {recall_hits / recall_total:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Suggest index build time and per-keystroke lookup cost on synthetic rules.
+
+  PYTHONPATH=src python scripts/bench_suggest.py [--canonical 3000 --synonyms 12000]
+"""
+import argparse
+import random
+import string
+import time
+
+from app.ingredients.resolve import CompiledRules, SynRule
+from app.ingredients.suggest import SuggestIndex
+
+
+def make_word(rng):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 10)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--canonical", type=int, default=3000)
+    parser.add_argument("--synonyms", type=int, default=12000)
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    canon = [(f"c{i}", " ".join(make_word(rng) for _ in range(rng.randint(1, 3))).title())
+             for i in range(args.canonical)]
+    rules = [SynRule(cid, name, name, "exact") for cid, name in canon]
+    for _ in range(args.synonyms):
+        cid, name = rng.choice(canon)
+        syn = " ".join(make_word(rng) for _ in range(rng.randint(1, 3)))
+        rules.append(SynRule(cid, name, syn, rng.choice(["exact", "contains"])))
+    compiled = CompiledRules(rules)
+    frequency = {cid: rng.randint(0, 5000) for cid, _ in canon}
+
+    t0 = time.perf_counter()
+    index = SuggestIndex(compiled, frequency)
+    build_ms = (time.perf_counter() - t0) * 1000
+
+    # Every prefix of random names, as typed
+    typed = []
+    while len(typed) < args.queries:
+        term = rng.choice(index.terms)
+        typed.extend(term[:n] for n in range(1, len(term) + 1))
+    typed = typed[:args.queries]
+
+    t0 = time.perf_counter()
+    for q in typed:
+        index.suggest(q, 10)
+    per_query_us = (time.perf_counter() - t0) / len(typed) * 1e6
+
+    t0 = time.perf_counter()
+    for c in string.ascii_lowercase:
+        index.suggest(c, 10)
+    one_letter_us = (time.perf_counter() - t0) / 26 * 1e6
+
+    print(f"rules={len(rules)} entries={len(index.terms)}")
+    print(f"build: {build_ms:.1f} ms")
+    print(f"suggest: {per_query_us:.1f} us/keystroke avg, "
+          f"{one_letter_us:.1f} us for 1-letter prefixes")
+
+
+if __name__ == "__main__":
+    main()
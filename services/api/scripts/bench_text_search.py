@@ -0,0 +1,112 @@
+"""
+Ranked text search latency (search_products with q=) on a synthetic catalog.
+
+  PYTHONPATH=src python scripts/bench_text_search.py [--products 500000]
+
+Builds the catalog in a throwaway schema (bench_text_search) with migrations
+001/003/008 applied, times a selective term, a broad ingredient term, a
+multi-word query and a misspelling, then drops the schema. Needs the usual DB_*
+environment and the pg_trgm extension available.
+"""
+import argparse
+import statistics
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from app.catalog import search
+from app.db import get_conn
+
+SCHEMA = "bench_text_search"
+DB_DIR = Path(__file__).resolve().parents[1] / "db"
+
+WORDS = ["chicken", "salmon", "lamb", "turkey", "duck", "venison", "beef", "trout",
+         "rice", "oat", "barley", "pea", "lentil", "potato", "pumpkin", "kelp"]
+
+SEED_SQL = [
+    """
+    INSERT INTO brands (name, slug)
+    SELECT 'Brand ' || g, 'brand-' || g FROM generate_series(1, 500) g
+    """,
+    """
+    INSERT INTO products (brand_id, name, slug, species, format, life_stage)
+    SELECT b.id,
+           initcap((%(words)s::text[])[g %% 16 + 1]) || ' & '
+             || initcap((%(words)s::text[])[(g / 16) %% 16 + 1]) || ' Recipe ' || g,
+           'product-' || g, 'dog', 'dry', 'adult'
+    FROM generate_series(1, %(products)s) g
+    JOIN brands b ON b.slug = 'brand-' || (g %% 500 + 1)
+    """,
+    """
+    INSERT INTO product_ingredient_lists (product_id, version)
+    SELECT p.id, 1 FROM products p
+    """,
+    """
+    INSERT INTO product_ingredient_items (ingredient_list_id, raw_text, order_index)
+    SELECT il.id, (%(words)s::text[])[abs(hashtext(il.id::text) + i * 7919) %% 16 + 1] || ' meal', i
+    FROM product_ingredient_lists il
+    CROSS JOIN generate_series(0, 11) i
+    """,
+    "ANALYZE",
+]
+
+QUERIES = {
+    "selective": "Recipe 4242",
+    "broad": "kelp",
+    "multi-word": "salmon rice",
+    "typo": "venisson",
+}
+
+
+def _time(q, runs):
+    search.search_products("dog", None, None, [], limit=25, q=q)  # warm-up
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        search.search_products("dog", None, None, [], limit=25, q=q)
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=500_000)
+    parser.add_argument("--runs", type=int, default=30)
+    args = parser.parse_args()
+
+    with get_conn() as conn:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            try:
+                cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+                cur.execute(f"CREATE SCHEMA {SCHEMA}")
+                cur.execute(f"SET search_path = {SCHEMA}, public")
+                cur.execute((DB_DIR / "schema.sql").read_text())
+                for name in ("001_add_canonical_id.sql", "003_latest_ingredient_list.sql",
+                             "008_product_search.sql"):
+                    cur.execute((DB_DIR / "migrations" / name).read_text())
+
+                t0 = time.perf_counter()
+                for stmt in SEED_SQL:
+                    cur.execute(stmt, {"products": args.products, "words": WORDS})
+                print(f"seeded {args.products} products in {time.perf_counter() - t0:.1f} s")
+
+                # Run search_products on this connection, where search_path is the bench schema
+                @contextmanager
+                def bench_conn():
+                    yield conn
+
+                search.get_conn = bench_conn
+                print(f"ranking at most {search.SEARCH_RANK_CANDIDATES} candidates per query")
+                for label, q in QUERIES.items():
+                    p50, p95 = _time(q, args.runs)
+                    print(f"{label:<11} q={q!r:<14} p50 {p50:.1f} ms  p95 {p95:.1f} ms")
+            finally:
+                cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+                cur.execute("RESET search_path")
+        conn.autocommit = False
+
+
+if __name__ == "__main__":
+    main()
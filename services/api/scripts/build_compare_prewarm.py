@@ -0,0 +1,71 @@
+"""
+Pick the most requested compares from API logs and write them as the prewarm
+list a container computes when it starts serving compares.
+
+  PYTHONPATH=src python scripts/build_compare_prewarm.py logs/*.jsonl [--top 200]
+
+Input is the structured log output (one JSON object per line, optionally
+prefixed by a CloudWatch timestamp/request id); only "compare" lines are used.
+"""
+import argparse
+import json
+import sys
+from collections import Counter
+
+from app.compare.cache import COMPARE_PREWARM_MAX, COMPARE_PREWARM_PATH
+
+
+def iter_compares(lines):
+    for line in lines:
+        start = line.find("{")
+        if start < 0:
+            continue
+        try:
+            rec = json.loads(line[start:])
+        except ValueError:
+            continue
+        if rec.get("message") != "compare" or not rec.get("product_ids"):
+            continue
+        yield (
+            tuple(sorted(rec["product_ids"])),
+            rec.get("mode") or "raw",
+            bool(rec.get("include_trace")),
+            bool(rec.get("include_may_contain")),
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the compare prewarm list from logs")
+    parser.add_argument("logs", nargs="*", help="log files (default: stdin)")
+    parser.add_argument("--top", type=int, default=COMPARE_PREWARM_MAX)
+    parser.add_argument("--out", default=COMPARE_PREWARM_PATH)
+    args = parser.parse_args()
+
+    counts = Counter()
+    if args.logs:
+        for path in args.logs:
+            with open(path, encoding="utf-8") as f:
+                counts.update(iter_compares(f))
+    else:
+        counts.update(iter_compares(sys.stdin))
+
+    entries = [
+        {
+            "product_tokens": list(ids),
+            "mode": mode,
+            "include_trace": trace,
+            "include_may_contain": may_contain,
+        }
+        for (ids, mode, trace, may_contain), _ in counts.most_common(args.top)
+    ]
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(entries, f, indent=1)
+
+    total = sum(counts.values())
+    covered = sum(n for _, n in counts.most_common(args.top))
+    print(f"{len(entries)} compares covering {covered}/{total} logged requests -> {args.out}",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
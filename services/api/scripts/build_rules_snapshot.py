@@ -0,0 +1,27 @@
+"""
+Write the synonym rules to a JSON snapshot that ships in the Lambda bundle, so
+a cold container can build its matcher without querying the database.
+
+  PYTHONPATH=src python scripts/build_rules_snapshot.py [path]
+
+Run it right before packaging; a stale snapshot is harmless (it is revalidated
+after RULES_TTL_S) but costs one rebuild per container.
+"""
+import argparse
+import sys
+
+from app.ingredients.resolve import RULES_SNAPSHOT_PATH, write_rules_snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the bundled rules snapshot")
+    parser.add_argument("path", nargs="?", default=RULES_SNAPSHOT_PATH)
+    args = parser.parse_args()
+
+    result = write_rules_snapshot(args.path)
+    print(f"Wrote {result['rules']} rules (version {result['version']}) to {result['path']}",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
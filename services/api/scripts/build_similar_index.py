@@ -0,0 +1,30 @@
+"""
+Build the similar-products MinHash index from the database and write it as the
+compact binary artifact loaded at cold start (id, signature and slug, about
+100 bytes per product).
+
+  PYTHONPATH=src python scripts/build_similar_index.py [path]
+"""
+import argparse
+import sys
+import time
+
+from app.catalog.similar import SIMILAR_INDEX_PATH, build_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the similar-products index artifact")
+    parser.add_argument("path", nargs="?", default=SIMILAR_INDEX_PATH)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    index = build_index()
+    data = index.to_bytes()
+    with open(args.path, "wb") as f:
+        f.write(data)
+    print(f"Indexed {len(index.ids)} products (canonical_ids version {index.fingerprint}) in "
+          f"{time.perf_counter() - t0:.1f}s, {len(data)} bytes -> {args.path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
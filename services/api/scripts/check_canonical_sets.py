@@ -0,0 +1,54 @@
+"""
+Verify products.canonical_ids against the items of each product's latest list.
+
+  PYTHONPATH=src python scripts/check_canonical_sets.py [--fix] [--limit 20]
+
+Exits 1 if any product is out of sync (after --fix, only if the repair failed).
+"""
+import argparse
+import sys
+
+from app.db import get_conn
+
+DRIFT_SQL = """
+  SELECT p.id::text, p.slug, cardinality(p.canonical_ids), cardinality(x.ids)
+  FROM products p
+  CROSS JOIN LATERAL (SELECT product_canonical_ids(p.latest_ingredient_list_id) AS ids) x
+  WHERE p.canonical_ids IS DISTINCT FROM x.ids
+  ORDER BY p.id
+"""
+
+FIX_SQL = """
+  UPDATE products
+  SET canonical_ids = product_canonical_ids(latest_ingredient_list_id)
+  WHERE canonical_ids IS DISTINCT FROM product_canonical_ids(latest_ingredient_list_id)
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fix", action="store_true", help="rewrite drifted rows")
+    parser.add_argument("--limit", type=int, default=20, help="drifted rows to print")
+    args = parser.parse_args()
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(DRIFT_SQL)
+            drifted = cur.fetchall()
+
+            for product_id, slug, stored, expected in drifted[: args.limit]:
+                print(f"{product_id} {slug}: stored {stored} ids, expected {expected}")
+            print(f"{len(drifted)} product(s) out of sync")
+
+            if drifted and args.fix:
+                cur.execute(FIX_SQL)
+                print(f"fixed {cur.rowcount} product(s)")
+                conn.commit()
+                cur.execute(DRIFT_SQL)
+                drifted = cur.fetchall()
+
+    sys.exit(1 if drifted else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+import argparse
+import sys
+
+from app.catalog.export import export_catalog, iter_catalog_ndjson
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the active catalog as NDJSON")
+    parser.add_argument("target", nargs="?", default="-",
+                        help="'-' for plain NDJSON on stdout, else a .gz path or s3://bucket/key")
+    args = parser.parse_args()
+
+    if args.target == "-":
+        out = sys.stdout.buffer
+        for line in iter_catalog_ndjson():
+            out.write(line)
+        out.flush()
+        return
+
+    result = export_catalog(args.target)
+    print(f"Exported {result['products']} products to {result['target']}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
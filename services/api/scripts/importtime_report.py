@@ -0,0 +1,98 @@
+"""
+Cold-start import cost of the Lambda entry point, from `python -X importtime`.
+
+  PYTHONPATH=src python scripts/importtime_report.py [--budget-ms 150] [--top 15]
+
+Imports app.main in a fresh interpreter (so nothing is already cached), prints
+the slowest modules by cumulative time, then serves /health in the same
+process and imports every route module. Exits 1 if the app.main import exceeds
+--budget-ms or if any of the --deferred modules (by default the DB client
+libraries) got imported along the way.
+Take the median of a few runs (--runs) since single timings are noisy.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+DEFERRED = ("psycopg", "boto3", "botocore")
+
+PROBE = """
+import importlib
+import sys
+import app.main
+from app.main import PRELOAD_MODULES, handle_request
+handle_request({"httpMethod": "GET", "path": "/health", "headers": {}}, None)
+for name in PRELOAD_MODULES:
+    importlib.import_module(name)
+print(",".join(sorted({m.split(".")[0] for m in sys.modules})))
+"""
+
+
+def run_once(python):
+    env = dict(os.environ)
+    env.setdefault("PYTHONPATH", "src")
+    # -X importtime writes to stderr; bytecode is expected to be compiled in the bundle
+    proc = subprocess.run(
+        [python, "-X", "importtime", "-c", PROBE],
+        capture_output=True, text=True, env=env,
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(f"probe failed with exit code {proc.returncode}")
+
+    # "import time: self [us] | cumulative | imported package"
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    loaded = set(proc.stdout.strip().split(","))
+    return rows, loaded
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--budget-ms", type=float, default=150.0)
+    ap.add_argument("--top", type=int, default=15)
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--deferred", default=",".join(DEFERRED),
+                    help="comma-separated top-level modules that must not load "
+                         "before the first DB use")
+    ap.add_argument("--python", default=sys.executable)
+    args = ap.parse_args()
+
+    totals = []
+    rows, loaded = [], set()
+    for _ in range(args.runs):
+        rows, loaded = run_once(args.python)
+        main_row = next((r for r in rows if r[0] == "app.main"), None)
+        if main_row is None:
+            raise SystemExit("app.main not found in -X importtime output")
+        totals.append(main_row[2] / 1000)
+
+    print(f"{'module':<44} {'self ms':>8} {'cum ms':>8}")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda r: -r[2])[:args.top]:
+        print(f"{name:<44} {self_us / 1000:8.2f} {cumulative_us / 1000:8.2f}")
+
+    total = statistics.median(totals)
+    print(f"\nimport app.main: {total:.1f} ms (median of {args.runs}), "
+          f"budget {args.budget_ms:.0f} ms")
+
+    failed = False
+    if total > args.budget_ms:
+        print(f"FAIL: over budget by {total - args.budget_ms:.1f} ms")
+        failed = True
+    early = sorted(m for m in args.deferred.split(",") if m and m in loaded)
+    if early:
+        print(f"FAIL: imported before first DB use: {', '.join(early)}")
+        failed = True
+    if not failed:
+        print("OK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
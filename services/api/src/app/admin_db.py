@@ -1,4 +1,6 @@
 from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Tuple
+
 from app.db import get_conn
 
 # /var/task/app/admin_db.py -> parents[1] == /var/task
@@ -14,3 +16,49 @@ def apply_sql(filename: str) -> None:
 def apply_all() -> None:
     apply_sql("schema.sql")
     apply_sql("seed.sql")
+
+
+# Applied migration files, so each one runs once instead of on every /admin/migrate
+LEDGER_SQL = """
+  CREATE TABLE IF NOT EXISTS schema_migrations (
+    name text PRIMARY KEY,
+    applied_at timestamptz NOT NULL DEFAULT now()
+  )
+"""
+
+# Serializes concurrent /admin/migrate calls for the duration of one file's transaction
+LOCK_SQL = "SELECT pg_advisory_xact_lock(hashtext('schema_migrations'))"
+
+# Stop starting new files once less than this is left before the Lambda deadline
+MIGRATION_RESERVE_MS = 3000
+
+
+def apply_migrations(
+    names: Sequence[str],
+    directory: Path = Path("db/migrations"),
+    time_left_ms: Optional[Callable[[], int]] = None,
+) -> Tuple[List[str], List[str]]:
+    """
+    Apply the files in `names` (in order) that schema_migrations doesn't list yet,
+    each in its own transaction together with its ledger row. Returns (applied,
+    pending); pending is non-empty when the deadline stopped the run early, and a
+    later call picks up where this one stopped.
+    """
+    applied: List[str] = []
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(LEDGER_SQL)
+        conn.commit()
+
+        for i, name in enumerate(names):
+            if time_left_ms is not None and time_left_ms() < MIGRATION_RESERVE_MS:
+                return applied, list(names[i:])
+            with conn.cursor() as cur:
+                cur.execute(LOCK_SQL)
+                cur.execute("SELECT 1 FROM schema_migrations WHERE name = %s", (name,))
+                if cur.fetchone() is None:
+                    cur.execute((directory / name).read_text())
+                    cur.execute("INSERT INTO schema_migrations (name) VALUES (%s)", (name,))
+                    applied.append(name)
+            conn.commit()
+    return applied, []
@@ -0,0 +1,94 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+
+
+class ResponseCache:
+    """
+    Bounded LRU of serialized response bodies with a per-entry TTL.
+
+    Entries are tagged with the catalog version they were built from; a lookup
+    with a different version is a miss and drops the entry.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # key -> (version, expires_at, body, size)
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float, str, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, version: Any) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            entry_version, expires_at, body, size = entry
+            if entry_version != version or expires_at <= time.monotonic():
+                self._drop(key, size)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key: Hashable, version: Any, body: str, ttl_s: float) -> None:
+        size = sys.getsizeof(body)
+        if ttl_s <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[3]
+            self._entries[key] = (version, time.monotonic() + ttl_s, body, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted[3]
+                self.evictions += 1
+
+    def get_or_build(self, key: Hashable, version: Any, ttl_s: float,
+                     build: Callable[[], Optional[str]]) -> Optional[str]:
+        # version None means "unknown": bypass the cache rather than risk staleness
+        if version is None:
+            return build()
+        body = self.get(key, version)
+        if body is None:
+            body = build()
+            if body is not None:
+                self.put(key, version, body, ttl_s)
+        return body
+
+    def _drop(self, key: Hashable, size: int) -> None:
+        del self._entries[key]
+        self._bytes -= size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+RESPONSE_CACHE = ResponseCache()
@@ -0,0 +1,79 @@
+import base64
+import math
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from app.serialization import dumps_bytes, loads
+
+MAX_PAGE_SIZE = 100
+
+# Resume after (brand name, product name, id); params are brand name twice, then
+# product name and id. The leading b.name >= %s is what can seek: brands are
+# walked from the cursor's brand via the unique brands.name index, and only that
+# one brand's products go through the row comparison.
+BRAND_KEYSET_SQL = "b.name >= %s AND (b.name, p.name, p.id) > (%s, %s, %s::uuid)"
+
+
+def _text(value: Any) -> str:
+    # Postgres text can't hold NUL
+    if not isinstance(value, str) or "\x00" in value:
+        raise ValueError
+    return value
+
+
+def _number(value: Any) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError
+    return float(value)
+
+
+def _int(value: Any) -> int:
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError
+    return value
+
+
+def _uuid(value: Any) -> str:
+    if not isinstance(value, str):
+        raise ValueError
+    return str(uuid.UUID(value))
+
+
+# Cursor element types: decode_cursor(token, ("str", "str", "uuid"))
+CURSOR_TYPES: Dict[str, Callable[[Any], Any]] = {
+    "str": _text,
+    "float": _number,
+    "int": _int,
+    "uuid": _uuid,
+}
+
+
+def encode_cursor(values: List[Any]) -> str:
+    raw = dumps_bytes(values)
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: Optional[str], types: Sequence[str]) -> Optional[List[Any]]:
+    # Opaque to clients; anything that doesn't round-trip to `types` is a bad
+    # request, so crafted values never reach the database
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError("invalid cursor")
+    if not isinstance(values, list) or len(values) != len(types):
+        raise ValueError("invalid cursor")
+    try:
+        return [CURSOR_TYPES[t](v) for t, v in zip(types, values)]
+    except ValueError:
+        raise ValueError("invalid cursor")
+
+
+def page_size(value: Any, default: int) -> int:
+    try:
+        limit = int(value or default)
+    except (TypeError, ValueError):
+        raise ValueError("limit must be an integer")
+    return max(1, min(limit, MAX_PAGE_SIZE))
@@ -0,0 +1,245 @@
+import gzip
+import io
+import os
+import re
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from app.catalog.cursor import decode_cursor, encode_cursor
+from app.catalog.rows import product_row
+from app.db import get_conn
+from app.serialization import dumps_bytes
+
+BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+# S3 multipart parts must be >= 5 MiB (except the last one)
+S3_PART_SIZE = 8 * 1024 * 1024
+
+# Where POST /catalog/export writes: s3://EXPORT_BUCKET/EXPORT_PREFIX<export_id>/,
+# from configuration only. Consumers (sitemap, search indexer, analytics) read
+# EXPORT_PREFIX + LATEST_KEY, which points at the last complete export's manifest.
+EXPORT_BUCKET = os.getenv("EXPORT_BUCKET", "")
+EXPORT_PREFIX = os.getenv("EXPORT_PREFIX", "catalog-exports/")
+LATEST_KEY = "latest.json"
+# Stop starting new batches once less than this is left before the Lambda deadline
+EXPORT_RESERVE_MS = int(os.getenv("EXPORT_RESERVE_MS", "2000"))
+
+_EXPORT_ID_RE = re.compile(r"^\d{8}T\d{6}Z-[0-9a-f]{8}$")
+
+
+class ExportNotConfigured(RuntimeError):
+    pass
+
+EXPORT_SQL = """
+  SELECT
+    p.id, p.slug, p.name, p.species, p.format, p.life_stage, p.is_active,
+    b.id AS brand_id, b.slug AS brand_slug, b.name AS brand_name,
+    il.id AS il_id, il.version AS il_version, il.effective_date AS il_effective_date,
+    il.source_type AS il_source_type,
+    (
+      SELECT coalesce(json_agg(json_build_object(
+        'raw_text', pi.raw_text,
+        'order_index', pi.order_index,
+        'is_may_contain', pi.is_may_contain,
+        'is_trace', pi.is_trace,
+        'canonical_id', pi.canonical_id
+      ) ORDER BY pi.order_index), '[]'::json)
+      FROM product_ingredient_items pi
+      WHERE pi.ingredient_list_id = il.id
+    ) AS il_items
+  FROM products p
+  JOIN brands b ON b.id = p.brand_id
+  LEFT JOIN product_ingredient_lists il ON il.id = p.latest_ingredient_list_id
+  WHERE p.is_active
+    AND (%s::uuid IS NULL OR p.id > %s::uuid)
+  ORDER BY p.id
+"""
+
+
+def _iter_rows(batch_size: int, after_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    # Server-side cursor: only one batch of rows is held in memory at a time
+    with get_conn() as conn:
+        with conn.cursor(name="catalog_export", row_factory=product_row) as cur:
+            cur.itersize = batch_size
+            cur.execute(EXPORT_SQL, (after_id, after_id))
+            yield from cur
+
+
+def iter_catalog_ndjson(batch_size: int = BATCH_SIZE) -> Iterator[bytes]:
+    for row in _iter_rows(batch_size):
+        yield dumps_bytes(row) + b"\n"
+
+
+def _s3_client():
+    import boto3
+
+    return boto3.client(
+        "s3",
+        region_name=os.environ.get("AWS_REGION", "us-west-2"),
+        endpoint_url=os.environ.get("EXPORT_S3_ENDPOINT_URL") or None,
+    )
+
+
+class _S3MultipartWriter(io.RawIOBase):
+    """Write-only file object that uploads to S3 in fixed-size multipart parts."""
+
+    def __init__(self, bucket: str, key: str):
+        self._s3 = _s3_client()
+        self._bucket = bucket
+        self._key = key
+        self._buf = bytearray()
+        self._parts = []
+        self._upload_id = self._s3.create_multipart_upload(
+            Bucket=bucket, Key=key, ContentType="application/x-ndjson", ContentEncoding="gzip",
+        )["UploadId"]
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._buf += b
+        if len(self._buf) >= S3_PART_SIZE:
+            self._flush_part()
+        return len(b)
+
+    def _flush_part(self) -> None:
+        part_number = len(self._parts) + 1
+        resp = self._s3.upload_part(
+            Bucket=self._bucket, Key=self._key, UploadId=self._upload_id,
+            PartNumber=part_number, Body=bytes(self._buf),
+        )
+        self._parts.append({"PartNumber": part_number, "ETag": resp["ETag"]})
+        self._buf.clear()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        if self._buf or not self._parts:
+            self._flush_part()
+        self._s3.complete_multipart_upload(
+            Bucket=self._bucket, Key=self._key, UploadId=self._upload_id,
+            MultipartUpload={"Parts": self._parts},
+        )
+        super().close()
+
+    def abort(self) -> None:
+        self._s3.abort_multipart_upload(
+            Bucket=self._bucket, Key=self._key, UploadId=self._upload_id
+        )
+        super().close()
+
+
+def _open_sink(target: str):
+    if target.startswith("s3://"):
+        bucket, _, key = target[len("s3://"):].partition("/")
+        if not bucket or not key:
+            raise ValueError("target must look like s3://bucket/key")
+        return _S3MultipartWriter(bucket, key)
+    return open(target, "wb")
+
+
+def _write_gzip(target: str, rows: Iterable[Dict[str, Any]], batch_size: int,
+                stop: Optional[Callable[[], bool]] = None) -> Tuple[int, int, Optional[str], bool]:
+    """
+    Gzip NDJSON of `rows` to `target`, checking `stop` after every batch.
+    Returns (products, uncompressed bytes, last product id, reached the end).
+    """
+    raw = _open_sink(target)
+    products = 0
+    uncompressed = 0
+    last_id = None
+    done = False
+    try:
+        with gzip.GzipFile(fileobj=raw, mode="wb") as gz:
+            for row in rows:
+                line = dumps_bytes(row) + b"\n"
+                gz.write(line)
+                products += 1
+                uncompressed += len(line)
+                last_id = str(row["id"])
+                if stop is not None and products % batch_size == 0 and stop():
+                    break
+            else:
+                done = True
+        raw.close()
+    except BaseException:
+        if isinstance(raw, _S3MultipartWriter):
+            raw.abort()
+        else:
+            raw.close()
+        raise
+    return products, uncompressed, last_id, done
+
+
+def export_catalog(target: str, batch_size: int = BATCH_SIZE) -> Dict[str, Any]:
+    """
+    Write the active catalog as gzip-compressed NDJSON to a local path or
+    s3://bucket/key in one go (scripts/export_catalog.py). Memory stays bounded
+    by one cursor batch plus one upload part.
+    """
+    products, uncompressed, _, _ = _write_gzip(target, _iter_rows(batch_size), batch_size)
+    return {"target": target, "products": products, "uncompressed_bytes": uncompressed}
+
+
+def _part_key(export_id: str, part: int) -> str:
+    return f"{EXPORT_PREFIX}{export_id}/part-{part:05d}.ndjson.gz"
+
+
+def _publish(export_id: str, parts: int) -> str:
+    """
+    Write the export's manifest, then point LATEST_KEY at it. Consumers only
+    ever see complete exports: latest.json moves after the last part is uploaded.
+    """
+    s3 = _s3_client()
+    manifest_key = f"{EXPORT_PREFIX}{export_id}/manifest.json"
+    manifest = {
+        "export_id": export_id,
+        "format": "ndjson+gzip",
+        "bucket": EXPORT_BUCKET,
+        "parts": [_part_key(export_id, n) for n in range(1, parts + 1)],
+    }
+    s3.put_object(Bucket=EXPORT_BUCKET, Key=manifest_key, Body=dumps_bytes(manifest),
+                  ContentType="application/json")
+    s3.put_object(Bucket=EXPORT_BUCKET, Key=EXPORT_PREFIX + LATEST_KEY,
+                  Body=dumps_bytes({"export_id": export_id, "manifest": manifest_key}),
+                  ContentType="application/json", CacheControl="no-cache")
+    return f"s3://{EXPORT_BUCKET}/{manifest_key}"
+
+
+def export_catalog_part(continuation_token: Optional[str] = None, batch_size: int = BATCH_SIZE,
+                        time_left_ms: Optional[Callable[[], int]] = None) -> Dict[str, Any]:
+    """
+    One invocation's share of an export: products after the token's id, in id
+    order, written as the next part-NNNNN.ndjson.gz of the export until the
+    deadline is close. Parts are independent gzip files; an unfinished export
+    returns a continuation_token for the next part, a finished one is published
+    (manifest.json, then latest.json). Raises ExportNotConfigured without
+    EXPORT_BUCKET: there is nowhere consumers could read an export from.
+    """
+    if not EXPORT_BUCKET:
+        raise ExportNotConfigured("EXPORT_BUCKET is not set")
+    if continuation_token:
+        export_id, after_id, part = decode_cursor(continuation_token, ("str", "uuid", "int"))
+        if not _EXPORT_ID_RE.match(export_id) or part < 1:
+            raise ValueError("invalid continuation token")
+    else:
+        export_id = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime()) + "-" + uuid.uuid4().hex[:8]
+        after_id, part = None, 1
+
+    def stop() -> bool:
+        return time_left_ms is not None and time_left_ms() < EXPORT_RESERVE_MS
+
+    target = f"s3://{EXPORT_BUCKET}/{_part_key(export_id, part)}"
+    products, uncompressed, last_id, done = _write_gzip(
+        target, _iter_rows(batch_size, after_id), batch_size, stop,
+    )
+    return {
+        "export_id": export_id,
+        "target": target,
+        "part": part,
+        "products": products,
+        "uncompressed_bytes": uncompressed,
+        "done": done,
+        "manifest": _publish(export_id, part) if done else None,
+        "continuation_token": None if done else encode_cursor([export_id, last_id, part + 1]),
+    }
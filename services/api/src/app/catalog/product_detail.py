@@ -1,31 +1,47 @@
+import os
 import re
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from app.catalog.rows import ingredient_item_row, product_row
 from app.db import get_conn
 
 UUID_RE = re.compile(
     r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$"
 )
 
+BATCH_GET_MAX = 50
+
+# "python" builds the response dict from two queries; "json_agg" has Postgres build
+# the final JSON document in one statement (see get_product_json_by_id_or_slug).
+DETAIL_MODE = os.getenv("PRODUCT_DETAIL_MODE", "python")
+
+# Product, brand and latest ingredient list in one round trip; the aliases give
+# the nested response shape (see app.catalog.rows)
+PRODUCT_COLUMNS = """
+  p.id, p.slug, p.name, p.species, p.format, p.life_stage, p.is_active,
+  b.id AS brand_id, b.slug AS brand_slug, b.name AS brand_name,
+  il.id AS il_id, il.version AS il_version, il.effective_date AS il_effective_date,
+  il.source_type AS il_source_type, il.source_ref AS il_source_ref, il.notes AS il_notes
+"""
+
+PRODUCT_FROM = """
+  FROM products p
+  JOIN brands b ON b.id = p.brand_id
+  LEFT JOIN product_ingredient_lists il ON il.id = p.latest_ingredient_list_id
+"""
+
+
 def get_product_by_id_or_slug(token: str):
     by_id = bool(UUID_RE.match(token))
 
     sql_product = f"""
-      SELECT
-        p.id, p.slug, p.name, p.species, p.format, p.life_stage, p.is_active,
-        b.id AS brand_id, b.slug AS brand_slug, b.name AS brand_name
-      FROM products p
-      JOIN brands b ON b.id = p.brand_id
+      SELECT {PRODUCT_COLUMNS}
+      {PRODUCT_FROM}
       WHERE {"p.id = %s" if by_id else "p.slug = %s"}
       LIMIT 1
     """
 
-    sql_latest_list = """
-      SELECT il.id, il.version, il.effective_date, il.source_type, il.source_ref, il.notes
-      FROM product_ingredient_lists il
-      WHERE il.product_id = %s
-      ORDER BY il.version DESC
-      LIMIT 1
-    """
-
     sql_items = """
       SELECT id, raw_text, order_index, is_may_contain, is_trace
       FROM product_ingredient_items
@@ -34,51 +50,117 @@ def get_product_by_id_or_slug(token: str):
     """
 
     with get_conn() as conn:
-        with conn.cursor() as cur:
+        with conn.cursor(row_factory=product_row) as cur:
             cur.execute(sql_product, (token,))
-            row = cur.fetchone()
-            if not row:
+            product = cur.fetchone()
+            if not product:
                 return None
 
-            product_id = row[0]
-            product = {
-                "id": str(row[0]),
-                "slug": row[1],
-                "name": row[2],
-                "species": row[3],
-                "format": row[4],
-                "life_stage": row[5],
-                "is_active": row[6],
-                "brand": {"id": str(row[7]), "slug": row[8], "name": row[9]},
-                "ingredient_list": None,
-            }
-
-            cur.execute(sql_latest_list, (product_id,))
-            il = cur.fetchone()
-            if not il:
+            il = product["ingredient_list"]
+            if il is None:
                 return product
 
-            ingredient_list_id = il[0]
-            cur.execute(sql_items, (ingredient_list_id,))
-            items = cur.fetchall()
-
-            product["ingredient_list"] = {
-                "id": str(il[0]),
-                "version": il[1],
-                "effective_date": il[2].isoformat() if il[2] else None,
-                "source_type": il[3],
-                "source_ref": il[4],
-                "notes": il[5],
-                "items": [
-                    {
-                        "id": str(r[0]),
-                        "raw_text": r[1],
-                        "order_index": r[2],
-                        "is_may_contain": r[3],
-                        "is_trace": r[4],
-                    }
-                    for r in items
-                ],
-            }
+            cur.row_factory = ingredient_item_row
+            cur.execute(sql_items, (il["id"],))
+            il["items"] = cur.fetchall()
 
             return product
+
+
+def get_product_json_by_id_or_slug(token: str) -> Optional[str]:
+    """
+    Same document as get_product_by_id_or_slug, built by Postgres and returned as
+    JSON text in a single round trip, ready to be used as the response body.
+    """
+    by_id = bool(UUID_RE.match(token))
+
+    sql = f"""
+      SELECT json_build_object(
+        'id', p.id,
+        'slug', p.slug,
+        'name', p.name,
+        'species', p.species,
+        'format', p.format,
+        'life_stage', p.life_stage,
+        'is_active', p.is_active,
+        'brand', json_build_object('id', b.id, 'slug', b.slug, 'name', b.name),
+        'ingredient_list', CASE WHEN il.id IS NULL THEN NULL ELSE json_build_object(
+          'id', il.id,
+          'version', il.version,
+          'effective_date', il.effective_date,
+          'source_type', il.source_type,
+          'source_ref', il.source_ref,
+          'notes', il.notes,
+          'items', coalesce((
+            SELECT json_agg(json_build_object(
+              'id', pi.id,
+              'raw_text', pi.raw_text,
+              'order_index', pi.order_index,
+              'is_may_contain', pi.is_may_contain,
+              'is_trace', pi.is_trace
+            ) ORDER BY pi.order_index)
+            FROM product_ingredient_items pi
+            WHERE pi.ingredient_list_id = il.id
+          ), '[]'::json)
+        ) END
+      )::text
+      {PRODUCT_FROM}
+      WHERE {"p.id = %s" if by_id else "p.slug = %s"}
+      LIMIT 1
+    """
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql, (token,))
+            row = cur.fetchone()
+    return row[0] if row else None
+
+
+def get_products_by_ids_or_slugs(tokens: List[str]) -> List[Dict[str, Any]]:
+    """
+    Batch version of get_product_by_id_or_slug: two queries regardless of how
+    many tokens are given. Results follow input order; unknown tokens come back
+    with found=False.
+    """
+    by_id = [t for t in tokens if UUID_RE.match(t)]
+    by_slug = [t for t in tokens if not UUID_RE.match(t)]
+
+    sql_products = f"""
+      SELECT {PRODUCT_COLUMNS}
+      {PRODUCT_FROM}
+      WHERE p.id = ANY(%s::uuid[]) OR p.slug = ANY(%s::text[])
+    """
+
+    sql_items = """
+      SELECT ingredient_list_id, id, raw_text, order_index, is_may_contain, is_trace
+      FROM product_ingredient_items
+      WHERE ingredient_list_id = ANY(%s::uuid[])
+      ORDER BY ingredient_list_id, order_index ASC
+    """
+
+    by_token: Dict[str, Dict[str, Any]] = {}
+    with get_conn() as conn:
+        with conn.cursor(row_factory=product_row) as cur:
+            cur.execute(sql_products, (by_id, by_slug))
+            products = cur.fetchall()
+
+            list_ids = [p["ingredient_list"]["id"] for p in products if p["ingredient_list"]]
+            items_by_list: Dict[Any, List[Dict[str, Any]]] = defaultdict(list)
+            if list_ids:
+                cur.row_factory = ingredient_item_row
+                cur.execute(sql_items, (list_ids,))
+                for item in cur.fetchall():
+                    items_by_list[item.pop("ingredient_list_id")].append(item)
+
+    for product in products:
+        il = product["ingredient_list"]
+        if il is not None:
+            il["items"] = items_by_list.get(il["id"], [])
+        by_token[str(product["id"])] = product
+        by_token[product["slug"]] = product
+
+    out = []
+    for t in tokens:
+        product = by_token.get(t.lower() if UUID_RE.match(t) else t)
+        out.append({"token": t, "found": product is not None, "product": product})
+    return out
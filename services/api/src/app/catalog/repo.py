@@ -1,37 +1,42 @@
+from typing import Any, List, Optional, Tuple
+
+from app.catalog.cursor import BRAND_KEYSET_SQL, decode_cursor, encode_cursor
+from app.catalog.rows import product_row
 from app.db import get_conn
 
 
-def list_products(limit: int = 20):
-    sql = """
+def list_products(limit: int = 20,
+                  cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+    after = decode_cursor(cursor, ("str", "str", "uuid"))
+    params: List[Any] = []
+    keyset_sql = ""
+    if after:
+        keyset_sql = f"AND {BRAND_KEYSET_SQL}"
+        params.extend([after[0], *after])
+
+    sql = f"""
       SELECT
         p.id, p.slug, p.name, p.species, p.format, p.life_stage, p.is_active,
         b.id AS brand_id, b.slug AS brand_slug, b.name AS brand_name
       FROM products p
       JOIN brands b ON b.id = p.brand_id
       WHERE p.is_active = true
-      ORDER BY b.name, p.name
+      {keyset_sql}
+      ORDER BY b.name, p.name, p.id
       LIMIT %s
     """
+    # One extra row tells us whether there is a next page
+    params.append(limit + 1)
+
     with get_conn() as conn:
-        with conn.cursor() as cur:
-            cur.execute(sql, (limit,))
+        with conn.cursor(row_factory=product_row) as cur:
+            cur.execute(sql, tuple(params))
             rows = cur.fetchall()
 
-    items = []
-    for r in rows:
-        items.append({
-            "id": str(r[0]),
-            "slug": r[1],
-            "name": r[2],
-            "species": r[3],
-            "format": r[4],
-            "life_stage": r[5],
-            "is_active": r[6],
-            "brand": {
-                "id": str(r[7]),
-                "slug": r[8],
-                "name": r[9],
-            },
-        })
+    items = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor([last["brand"]["name"], last["name"], last["id"]])
 
-    return items
+    return items, next_cursor
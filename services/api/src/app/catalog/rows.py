@@ -0,0 +1,143 @@
+from typing import Any, Callable, Dict, Optional, Sequence
+
+RowMaker = Callable[[Sequence[Any]], Dict[str, Any]]
+
+# Columns each builder understands. Joined entities are selected under these
+# aliases (brand_slug, il_version, ...). Anything else in a select list is a
+# query bug, reported as a TypeError when the statement's rows are first built.
+PRODUCT_COLUMNS = ("id", "slug", "name", "species", "format", "life_stage", "is_active", "score")
+BRAND_COLUMNS = ("brand_id", "brand_slug", "brand_name")
+INGREDIENT_LIST_COLUMNS = (
+    "il_id", "il_version", "il_effective_date", "il_source_type", "il_source_ref", "il_notes",
+    "il_items",
+)
+INGREDIENT_ITEM_COLUMNS = (
+    "ingredient_list_id", "id", "raw_text", "order_index", "is_may_contain", "is_trace",
+)
+
+
+def _positions(cursor, *allowed: Sequence[str]) -> Optional[Dict[str, int]]:
+    # Column name -> index in the row, None when the statement returned no rows
+    description = cursor.description
+    if not description:
+        return None
+    positions = {c.name: i for i, c in enumerate(description)}
+    known = {name for names in allowed for name in names}
+    unknown = [name for name in positions if name not in known]
+    if unknown:
+        raise TypeError(f"no response field for column(s): {', '.join(unknown)}")
+    return positions
+
+
+def _required(positions: Dict[str, int], *names: str) -> Sequence[int]:
+    missing = [name for name in names if name not in positions]
+    if missing:
+        raise TypeError(f"missing column(s): {', '.join(missing)}")
+    return [positions[name] for name in names]
+
+
+def _no_result(values: Sequence[Any]) -> Dict[str, Any]:
+    raise TypeError("the last statement returned no rows")
+
+
+def _brand_maker(positions: Dict[str, int]) -> RowMaker:
+    i_id, i_slug, i_name = _required(positions, *BRAND_COLUMNS)
+    return lambda v: {"id": v[i_id], "slug": v[i_slug], "name": v[i_name]}
+
+
+def _ingredient_list_maker(positions: Dict[str, int]) -> RowMaker:
+    i_id, i_version, i_date, i_source_type = _required(
+        positions, "il_id", "il_version", "il_effective_date", "il_source_type",
+    )
+    # Detail queries select the source fields; the export embeds the items instead
+    i_source_ref = positions.get("il_source_ref")
+    i_notes = positions.get("il_notes")
+    i_items = positions.get("il_items")
+
+    def make(v: Sequence[Any]) -> Dict[str, Any]:
+        il = {
+            "id": v[i_id],
+            "version": v[i_version],
+            "effective_date": v[i_date],
+            "source_type": v[i_source_type],
+        }
+        if i_source_ref is not None:
+            il["source_ref"] = v[i_source_ref]
+        if i_notes is not None:
+            il["notes"] = v[i_notes]
+        if i_items is not None:
+            il["items"] = v[i_items]
+        return il
+
+    return make
+
+
+def product_row(cursor) -> RowMaker:
+    """
+    psycopg row factory for product queries, building the response dict while
+    fetching: the product's own fields, then "brand" (brand_* columns), then
+    "ingredient_list" (il_* columns; None when il_id is NULL), then "score".
+    Each is included when the query selects it.
+    """
+    positions = _positions(cursor, PRODUCT_COLUMNS, BRAND_COLUMNS, INGREDIENT_LIST_COLUMNS)
+    if positions is None:
+        return _no_result
+
+    i_id, i_slug, i_name, i_species, i_format, i_life_stage = _required(
+        positions, "id", "slug", "name", "species", "format", "life_stage",
+    )
+    i_active = positions.get("is_active")
+    i_score = positions.get("score")
+    brand = _brand_maker(positions) if "brand_id" in positions else None
+    ingredient_list = _ingredient_list_maker(positions) if "il_id" in positions else None
+    i_list_id = positions.get("il_id")
+
+    def make(v: Sequence[Any]) -> Dict[str, Any]:
+        row = {
+            "id": v[i_id],
+            "slug": v[i_slug],
+            "name": v[i_name],
+            "species": v[i_species],
+            "format": v[i_format],
+            "life_stage": v[i_life_stage],
+        }
+        if i_active is not None:
+            row["is_active"] = v[i_active]
+        if brand is not None:
+            row["brand"] = brand(v)
+        if ingredient_list is not None:
+            row["ingredient_list"] = None if v[i_list_id] is None else ingredient_list(v)
+        if i_score is not None:
+            row["score"] = v[i_score]
+        return row
+
+    return make
+
+
+def ingredient_item_row(cursor) -> RowMaker:
+    """
+    psycopg row factory for product_ingredient_items queries. ingredient_list_id
+    is included when selected (batch queries group by it).
+    """
+    positions = _positions(cursor, INGREDIENT_ITEM_COLUMNS)
+    if positions is None:
+        return _no_result
+
+    i_id, i_raw, i_order, i_may_contain, i_trace = _required(
+        positions, "id", "raw_text", "order_index", "is_may_contain", "is_trace",
+    )
+    i_list_id = positions.get("ingredient_list_id")
+
+    def make(v: Sequence[Any]) -> Dict[str, Any]:
+        item = {
+            "id": v[i_id],
+            "raw_text": v[i_raw],
+            "order_index": v[i_order],
+            "is_may_contain": v[i_may_contain],
+            "is_trace": v[i_trace],
+        }
+        if i_list_id is not None:
+            item["ingredient_list_id"] = v[i_list_id]
+        return item
+
+    return make
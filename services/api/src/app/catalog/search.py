@@ -1,5 +1,36 @@
-from typing import Any, List, Optional
+import os
+from typing import Any, List, Optional, Tuple
+
+from app.catalog.cursor import BRAND_KEYSET_SQL, decode_cursor, encode_cursor
+from app.catalog.rows import product_row
 from app.db import get_conn
+from app.ingredients.hierarchy import get_closure
+
+MAX_QUERY_LENGTH = 200
+# Matches that get a text rank, per query. A broad term (a common ingredient)
+# can match most of the catalog, and ts_rank_cd reads each match's whole
+# tsvector; name/brand hits are kept first, so only ingredient-only matches
+# past the cap go unranked (and unreturned).
+SEARCH_RANK_CANDIDATES = int(os.getenv("SEARCH_RANK_CANDIDATES", "1000"))
+
+# Full-text match on products.search_tsv, or a typo-tolerant trigram match on
+# the name+brand string (migration 008). Each %s is the query text.
+TEXT_MATCH_SQL = """(
+  p.search_tsv @@ websearch_to_tsquery('english', %s)
+  OR %s <%% p.search_text
+)"""
+
+# Weighted text rank (name > brand > ingredients) plus trigram closeness
+TEXT_RANK_SQL = """(
+  ts_rank_cd(p.search_tsv, websearch_to_tsquery('english', %s))::float8
+  + word_similarity(%s, p.search_text)::float8
+)"""
+
+# Which SEARCH_RANK_CANDIDATES matches are ranked: name/brand hits (the short
+# search_text, cheap to test) before ingredient-only ones, then by id so every
+# page of a query ranks the same set. %s is the query text.
+RANK_CANDIDATES_ORDER_SQL = "(%s <%% p.search_text) DESC, p.id"
+
 
 def search_products(
     species: Optional[str],
@@ -7,7 +38,16 @@ def search_products(
     life_stage: Optional[str],
     exclude_canonical_ids: List[str],
     limit: int = 25,
-):
+    cursor: Optional[str] = None,
+    q: Optional[str] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    q = " ".join((q or "").split())
+    if len(q) > MAX_QUERY_LENGTH:
+        raise ValueError(f"q must be at most {MAX_QUERY_LENGTH} characters")
+    q_lower = q.lower()
+
+    # Ranked results page on (rank, id); unranked ones on (brand, name, id)
+    after = decode_cursor(cursor, ("float", "uuid") if q else ("str", "str", "uuid"))
     where = ["p.is_active = true"]
     params: List[Any] = []
 
@@ -21,52 +61,78 @@ def search_products(
         where.append("p.life_stage = %s")
         params.append(life_stage)
 
+    if q:
+        where.append(TEXT_MATCH_SQL)
+        params.extend([q, q_lower])
+    elif after:
+        where.append(BRAND_KEYSET_SQL)
+        params.extend([after[0], *after])
+
     exclude_sql = ""
     if exclude_canonical_ids:
-        exclude_sql = """
-          AND NOT EXISTS (
-            SELECT 1
-            FROM product_ingredient_lists il
-            JOIN product_ingredient_items pi ON pi.ingredient_list_id = il.id
-            WHERE il.product_id = p.id
-              AND il.version = (
-                SELECT MAX(version)
-                FROM product_ingredient_lists
-                WHERE product_id = p.id
-              )
-              AND pi.canonical_id = ANY(%s::uuid[])
+        # products.canonical_ids mirrors the latest list's canonical ids (migration 004).
+        # Excluding "Poultry" also excludes "Chicken" and vice versa.
+        exclude_sql = "AND NOT (p.canonical_ids && %s::uuid[])"
+        params.append(get_closure().expand(exclude_canonical_ids))
+
+    if q:
+        # Rank only a capped candidate set; the (rank, id) keyset applies within it
+        params.extend([q_lower, SEARCH_RANK_CANDIDATES, q, q_lower])
+        keyset_sql = ""
+        if after:
+            keyset_sql = f"WHERE ({TEXT_RANK_SQL}, p.id) < (%s, %s::uuid)"
+            params.extend([q, q_lower, *after])
+        sql = f"""
+          WITH candidates AS (
+            SELECT p.id
+            FROM products p
+            WHERE {" AND ".join(where)}
+            {exclude_sql}
+            ORDER BY {RANK_CANDIDATES_ORDER_SQL}
+            LIMIT %s
           )
+          SELECT
+            p.id, p.slug, p.name, p.species, p.format, p.life_stage,
+            b.id AS brand_id, b.slug AS brand_slug, b.name AS brand_name,
+            {TEXT_RANK_SQL} AS score
+          FROM candidates c
+          JOIN products p ON p.id = c.id
+          JOIN brands b ON b.id = p.brand_id
+          {keyset_sql}
+          ORDER BY score DESC, p.id DESC
+          LIMIT %s
         """
-        params.append(exclude_canonical_ids)
-
-    sql = f"""
-      SELECT
-        p.id, p.slug, p.name, p.species, p.format, p.life_stage,
-        b.id AS brand_id, b.slug AS brand_slug, b.name AS brand_name
-      FROM products p
-      JOIN brands b ON b.id = p.brand_id
-      WHERE {" AND ".join(where)}
-      {exclude_sql}
-      ORDER BY b.name, p.name
-      LIMIT %s
-    """
-    params.append(limit)
+    else:
+        sql = f"""
+          SELECT
+            p.id, p.slug, p.name, p.species, p.format, p.life_stage,
+            b.id AS brand_id, b.slug AS brand_slug, b.name AS brand_name
+          FROM products p
+          JOIN brands b ON b.id = p.brand_id
+          WHERE {" AND ".join(where)}
+          {exclude_sql}
+          ORDER BY b.name, p.name, p.id
+          LIMIT %s
+        """
+    # One extra row tells us whether there is a next page
+    params.append(limit + 1)
 
     with get_conn() as conn:
-        with conn.cursor() as cur:
+        with conn.cursor(row_factory=product_row) as cur:
             cur.execute(sql, tuple(params))
             rows = cur.fetchall()
 
-    items = []
-    for r in rows:
-        items.append({
-            "id": str(r[0]),
-            "slug": r[1],
-            "name": r[2],
-            "species": r[3],
-            "format": r[4],
-            "life_stage": r[5],
-            "brand": {"id": str(r[6]), "slug": r[7], "name": r[8]},
-        })
+    items = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        if q:
+            # Exact float, so the next page's row comparison resumes precisely
+            next_cursor = encode_cursor([last["score"], last["id"]])
+        else:
+            next_cursor = encode_cursor([last["brand"]["name"], last["name"], last["id"]])
 
-    return items
+    if q:
+        for item in items:
+            item["score"] = round(item["score"], 4)
+    return items, next_cursor
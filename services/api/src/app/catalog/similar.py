@@ -0,0 +1,374 @@
+import hashlib
+import os
+import random
+import struct
+import threading
+import uuid
+from array import array
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.catalog.product_detail import UUID_RE
+from app.db import get_conn
+from app.observability import incr
+
+# 64 one-byte minhashes per product (b-bit MinHash), banded 16 x 4 for LSH. A
+# pair with Jaccard J shares a band with probability 1 - (1 - J^4)^16, i.e.
+# ~50% at J=0.5 and ~97% at J=0.75.
+NUM_PERM = 64
+BAND_ROWS = 4
+BANDS = NUM_PERM // BAND_ROWS
+SEED = 20240611
+_PRIME = (1 << 61) - 1
+
+SIMILAR_MAX_K = 50
+# Candidates kept (per requested result) for the exact re-rank
+CANDIDATE_FACTOR = 5
+# Without an index: overlapping products read from the GIN index before ranking
+SIMILAR_QUERY_SCAN = int(os.getenv("SIMILAR_QUERY_SCAN", "2000"))
+# Prebuilt index shipped in the bundle (scripts/build_similar_index.py); optional
+SIMILAR_INDEX_PATH = os.getenv(
+    "SIMILAR_INDEX_PATH", os.path.join(os.path.dirname(__file__), "similar_index.bin")
+)
+
+_MAGIC = b"PXSIM02\0"
+_SLUG_LEN = struct.Struct("<H")
+_HEADER = struct.Struct("<8sHHIq")
+
+_rng = random.Random(SEED)
+_COEFFS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+_HASHES: Dict[str, Tuple[int, ...]] = {}
+
+# Bumped only when products' canonical_ids or is_active change (migration 009)
+FINGERPRINT_SQL = "SELECT canonical_ids_version FROM catalog_version"
+
+INDEX_SQL = """
+  SELECT id::text, slug, canonical_ids::text[]
+  FROM products
+  WHERE is_active AND cardinality(canonical_ids) > 0
+"""
+
+PRODUCT_SQL = """
+  SELECT p.id::text, p.slug, p.name, p.canonical_ids::text[]
+  FROM products p
+  WHERE {where}
+  LIMIT 1
+"""
+
+CANDIDATES_SQL = """
+  SELECT p.id::text, p.slug, p.name, p.canonical_ids::text[],
+         b.id::text, b.slug, b.name
+  FROM products p
+  JOIN brands b ON b.id = p.brand_id
+  WHERE p.id = ANY(%s::uuid[]) AND p.is_active
+"""
+
+# Query path for containers without an index: any SIMILAR_QUERY_SCAN products
+# sharing an ingredient (idx_products_canonical_ids), best overlap first
+QUERY_CANDIDATES_SQL = """
+  SELECT c.id::text, c.slug, c.name, c.canonical_ids::text[],
+         b.id::text, b.slug, b.name
+  FROM (
+    SELECT p.id, p.slug, p.name, p.canonical_ids, p.brand_id
+    FROM products p
+    WHERE p.canonical_ids && %(ids)s::uuid[] AND p.is_active AND p.id <> %(id)s::uuid
+    LIMIT %(scan)s
+  ) c
+  JOIN brands b ON b.id = c.brand_id
+  ORDER BY cardinality(ARRAY(
+    SELECT unnest(c.canonical_ids) INTERSECT SELECT unnest(%(ids)s::uuid[])
+  )) DESC
+  LIMIT %(limit)s
+"""
+
+
+def _hashes(canonical_id: str) -> Tuple[int, ...]:
+    # NUM_PERM universal hashes of one canonical id, memoized (the vocabulary is small)
+    h = _HASHES.get(canonical_id)
+    if h is None:
+        x = int.from_bytes(hashlib.blake2b(canonical_id.encode(), digest_size=8).digest(), "little")
+        h = _HASHES[canonical_id] = tuple((a * x + b) % _PRIME for a, b in _COEFFS)
+    return h
+
+
+def minhash(canonical_ids: Iterable[str]) -> Optional[bytes]:
+    """Signature of a canonical ingredient set: low byte of each per-permutation minimum."""
+    vectors = [_hashes(cid) for cid in set(canonical_ids)]
+    if not vectors:
+        return None
+    return bytes(min(col) & 0xFF for col in zip(*vectors))
+
+
+def jaccard(a: Iterable[str], b: Iterable[str]) -> float:
+    a, b = set(a), set(b)
+    union = len(a | b)
+    return len(a & b) / union if union else 0.0
+
+
+class SimilarIndex:
+    """
+    MinHash signatures for every active product with canonical ingredients, and
+    LSH buckets (one dict per band) over them. Buckets are rebuilt from the
+    signatures, so only ids, slugs and signatures need to be persisted.
+    `fingerprint` is the canonical_ids_version the index was built from.
+    """
+
+    def __init__(self, ids: List[str], slugs: List[str], signatures: List[bytes],
+                 fingerprint: Optional[int] = None):
+        self.ids = ids
+        self.slugs = slugs
+        self.signatures = signatures
+        self.fingerprint = fingerprint
+        self._positions: Dict[str, int] = {}
+        for idx, (product_id, slug) in enumerate(zip(ids, slugs)):
+            self._positions[product_id] = idx
+            self._positions[slug] = idx
+        self._buckets: List[Dict[bytes, array]] = []
+        for band in range(BANDS):
+            lo, hi = band * BAND_ROWS, (band + 1) * BAND_ROWS
+            buckets: Dict[bytes, array] = {}
+            for idx, sig in enumerate(signatures):
+                members = buckets.get(sig[lo:hi])
+                if members is None:
+                    members = buckets[sig[lo:hi]] = array("I")
+                members.append(idx)
+            self._buckets.append(buckets)
+
+    @classmethod
+    def from_sets(cls, rows: Iterable[Tuple[str, str, Iterable[str]]],
+                  fingerprint: Optional[int] = None) -> "SimilarIndex":
+        ids, slugs, signatures = [], [], []
+        for product_id, slug, canonical_ids in rows:
+            sig = minhash(canonical_ids)
+            if sig is not None:
+                ids.append(product_id)
+                slugs.append(slug)
+                signatures.append(sig)
+        return cls(ids, slugs, signatures, fingerprint)
+
+    def position(self, token: str) -> Optional[int]:
+        """Index of the product with this id or slug, if it is indexed."""
+        if UUID_RE.match(token):
+            token = token.lower()
+        return self._positions.get(token)
+
+    def candidates(self, sig: bytes, limit: int,
+                   exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        """
+        Products sharing at least one band with `sig`, best first, with an
+        estimated Jaccard from the full signatures.
+        """
+        hits: Counter = Counter()
+        for band, buckets in enumerate(self._buckets):
+            members = buckets.get(sig[band * BAND_ROWS:(band + 1) * BAND_ROWS])
+            if members is not None:
+                hits.update(members)
+
+        # Band hits are a cheap proxy; only the best few get a signature estimate
+        scored = []
+        for idx, _ in hits.most_common(limit * 4):
+            product_id = self.ids[idx]
+            if product_id == exclude:
+                continue
+            other = self.signatures[idx]
+            agree = sum(1 for x, y in zip(sig, other) if x == y) / NUM_PERM
+            # b-bit correction: unrelated bytes still agree 1/256 of the time
+            scored.append((product_id, max(0.0, (agree - 1 / 256) / (1 - 1 / 256))))
+        scored.sort(key=lambda x: -x[1])
+        return scored[:limit]
+
+    def to_bytes(self) -> bytes:
+        fingerprint = self.fingerprint if self.fingerprint is not None else -1
+        out = bytearray(_HEADER.pack(_MAGIC, NUM_PERM, BAND_ROWS, len(self.ids), fingerprint))
+        for product_id in self.ids:
+            out += uuid.UUID(product_id).bytes
+        for sig in self.signatures:
+            out += sig
+        for slug in self.slugs:
+            raw = slug.encode()
+            out += _SLUG_LEN.pack(len(raw)) + raw
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SimilarIndex":
+        magic, num_perm, band_rows, count, fingerprint = _HEADER.unpack_from(data)
+        if magic != _MAGIC or num_perm != NUM_PERM or band_rows != BAND_ROWS:
+            raise ValueError("incompatible similar index")
+        off = _HEADER.size
+        ids = [str(uuid.UUID(bytes=data[off + 16 * i:off + 16 * (i + 1)])) for i in range(count)]
+        off += 16 * count
+        signatures = [data[off + NUM_PERM * i:off + NUM_PERM * (i + 1)] for i in range(count)]
+        off += NUM_PERM * count
+        slugs = []
+        for _ in range(count):
+            (size,) = _SLUG_LEN.unpack_from(data, off)
+            off += _SLUG_LEN.size
+            slugs.append(data[off:off + size].decode())
+            off += size
+        return cls(ids, slugs, signatures, None if fingerprint < 0 else fingerprint)
+
+
+def index_fingerprint() -> Optional[int]:
+    """canonical_ids_version, or None if unavailable (e.g. migration 009 not applied)."""
+    import psycopg
+
+    try:
+        with get_conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute(FINGERPRINT_SQL)
+                row = cur.fetchone()
+    except psycopg.Error:
+        return None
+    return int(row[0]) if row else None
+
+
+def build_index() -> SimilarIndex:
+    # Read before the scan, so a change during the build triggers another one
+    fingerprint = index_fingerprint()
+    with get_conn() as conn:
+        with conn.cursor(name="similar_index") as cur:
+            cur.itersize = 5000
+            cur.execute(INDEX_SQL)
+            return SimilarIndex.from_sets(cur, fingerprint)
+
+
+def _read_index(path: str) -> Optional[SimilarIndex]:
+    try:
+        with open(path, "rb") as f:
+            return SimilarIndex.from_bytes(f.read())
+    except (OSError, ValueError, struct.error, UnicodeDecodeError):
+        return None
+
+
+_INDEX: Optional[SimilarIndex] = None
+# Whether get_index() already looked for the bundled artifact
+_ARTIFACT_READ = False
+_LOCK = threading.Lock()
+
+
+def refresh_index(force: bool = False) -> Tuple[SimilarIndex, bool]:
+    """
+    Load the bundled artifact if nothing is loaded yet, then rebuild from the
+    database if canonical_ids_version has moved past the index's fingerprint
+    (or always, with force). Returns the index and whether it was rebuilt. Run
+    from init() and POST /admin/similar-index, not from lookups: those keep
+    using the previous index until the new one is swapped in.
+    """
+    global _INDEX
+
+    with _LOCK:
+        index = _INDEX if _INDEX is not None else _read_index(SIMILAR_INDEX_PATH)
+        fingerprint = index_fingerprint()
+        rebuilt = (
+            index is None
+            or force
+            or (fingerprint is not None and fingerprint != index.fingerprint)
+        )
+        if rebuilt:
+            index = build_index()
+        _INDEX = index
+        return index, rebuilt
+
+
+def get_index() -> Optional[SimilarIndex]:
+    """
+    The loaded index, however old. A container that was initialized without
+    SIMILAR_INDEX_ON_INIT loads the bundled artifact here. It never builds one:
+    that is a full products scan, left to init() and POST /admin/similar-index.
+    None if nothing is loaded and there is no artifact.
+    """
+    global _INDEX, _ARTIFACT_READ
+
+    index = _INDEX
+    if index is not None or _ARTIFACT_READ:
+        return index
+    with _LOCK:
+        if _INDEX is None and not _ARTIFACT_READ:
+            _INDEX = _read_index(SIMILAR_INDEX_PATH)
+        _ARTIFACT_READ = True
+        return _INDEX
+
+
+def _fetch_rows(product_ids: List[str]) -> Dict[str, tuple]:
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(CANDIDATES_SQL, (product_ids,))
+            return {row[0]: row for row in cur.fetchall()}
+
+
+def _ranked(product_row: tuple, candidates: List[Tuple[str, float]],
+            rows: Dict[str, tuple], k: int) -> Dict[str, Any]:
+    product_id, slug, name, canonical_ids = product_row[:4]
+    estimated = dict(candidates)
+    query_set = set(canonical_ids or [])
+    items = []
+    for cid, cslug, cname, cids, brand_id, brand_slug, brand_name in rows.values():
+        if cid not in estimated:
+            continue
+        cset = set(cids or [])
+        items.append({
+            "id": cid,
+            "slug": cslug,
+            "name": cname,
+            "brand": {"id": brand_id, "slug": brand_slug, "name": brand_name},
+            "jaccard": round(jaccard(query_set, cset), 4),
+            "estimated_jaccard": round(estimated[cid], 4),
+            "shared_count": len(query_set & cset),
+        })
+    items.sort(key=lambda x: (-x["jaccard"], -x["shared_count"], x["name"]))
+    return {"product": {"id": product_id, "slug": slug, "name": name}, "items": items[:k]}
+
+
+def _query_candidates(product_row: tuple, limit: int) -> Dict[str, tuple]:
+    incr("similar.query_path")
+    params = {
+        "ids": product_row[3], "id": product_row[0], "scan": SIMILAR_QUERY_SCAN, "limit": limit,
+    }
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(QUERY_CANDIDATES_SQL, params)
+            return {row[0]: row for row in cur.fetchall()}
+
+
+def find_similar(token: str, k: int = 10) -> Optional[Dict[str, Any]]:
+    """
+    Top-k products by ingredient overlap with `token`: LSH candidates ranked by
+    estimated Jaccard, then re-ranked on the exact canonical sets. Without an
+    index the candidates come from the database instead (and their "estimate"
+    is the exact Jaccard). None if the product does not exist.
+    """
+    index = get_index()
+
+    # Indexed product: its candidates are known before any query, so it and
+    # they come back in one round trip. Checked against the fetched row in case
+    # it changed since the index was built.
+    position = index.position(token) if index is not None else None
+    if position is not None:
+        product_id, sig = index.ids[position], index.signatures[position]
+        candidates = index.candidates(sig, k * CANDIDATE_FACTOR, exclude=product_id)
+        rows = _fetch_rows([product_id] + [c[0] for c in candidates])
+        row = rows.get(product_id)
+        if row is not None and row[1] == index.slugs[position] and minhash(row[3] or []) == sig:
+            return _ranked(row, candidates, rows, k)
+
+    # Not indexed (new, inactive, without canonical ingredients) or changed
+    where = "p.id = %s" if UUID_RE.match(token) else "p.slug = %s"
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(PRODUCT_SQL.format(where=where), (token,))
+            row = cur.fetchone()
+    if not row:
+        return None
+
+    sig = minhash(row[3] or [])
+    if sig is None:
+        return _ranked(row, [], {}, k)
+    if index is None:
+        rows = _query_candidates(row, k * CANDIDATE_FACTOR)
+        query_set = set(row[3])
+        candidates = [(cid, jaccard(query_set, r[3] or [])) for cid, r in rows.items()]
+        return _ranked(row, candidates, rows, k)
+    candidates = index.candidates(sig, k * CANDIDATE_FACTOR, exclude=row[0])
+    if not candidates:
+        return _ranked(row, [], {}, k)
+    return _ranked(row, candidates, _fetch_rows([c[0] for c in candidates]), k)
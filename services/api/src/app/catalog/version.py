@@ -0,0 +1,48 @@
+import os
+import threading
+import time
+from typing import Optional
+
+from app.db import get_conn
+from app.observability import incr
+
+# How stale a container's view of catalog_version may be (seconds)
+VERSION_CHECK_INTERVAL_S = float(os.getenv("CATALOG_VERSION_CHECK_S", "5"))
+
+_VERSION: Optional[int] = None
+_CHECKED_AT: Optional[float] = None
+_LOCK = threading.Lock()
+
+
+def get_catalog_version() -> Optional[int]:
+    """
+    Current catalog_version, re-read at most every VERSION_CHECK_INTERVAL_S.
+    Returns None if it can't be read (migration 006 not applied, database or
+    pool unavailable); that outcome is cached for the interval too, so an outage
+    doesn't add a failing query to every request.
+    """
+    global _VERSION, _CHECKED_AT
+
+    checked_at = _CHECKED_AT
+    if checked_at is not None and time.monotonic() - checked_at < VERSION_CHECK_INTERVAL_S:
+        return _VERSION
+
+    with _LOCK:
+        now = time.monotonic()
+        if _CHECKED_AT is not None and now - _CHECKED_AT < VERSION_CHECK_INTERVAL_S:
+            return _VERSION
+
+        try:
+            with get_conn() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT version FROM catalog_version")
+                    row = cur.fetchone()
+            _VERSION = int(row[0]) if row else None
+        except Exception:
+            # psycopg errors, PoolTimeout, secret lookup failures: callers treat
+            # None as "unknown" (no ETag, no cached body) and the route's own query
+            # reports the outage
+            incr("catalog_version.errors")
+            _VERSION = None
+        _CHECKED_AT = now
+        return _VERSION
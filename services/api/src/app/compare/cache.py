@@ -0,0 +1,91 @@
+import json
+import os
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from app.cache import ResponseCache
+from app.observability import incr
+from app.serialization import dumps, loads
+
+COMPARE_CACHE_TTL_S = float(os.getenv("COMPARE_CACHE_TTL_S", "3600"))
+COMPARE_CACHE = ResponseCache(
+    max_entries=int(os.getenv("COMPARE_CACHE_MAX_ENTRIES", "2048")),
+    max_bytes=int(os.getenv("COMPARE_CACHE_MAX_BYTES", str(8 * 1024 * 1024))),
+)
+
+# Popular compares to compute when a container starts serving (see
+# scripts/build_compare_prewarm.py); optional
+COMPARE_PREWARM_PATH = os.getenv(
+    "COMPARE_PREWARM_PATH", os.path.join(os.path.dirname(__file__), "compare_prewarm.json")
+)
+COMPARE_PREWARM_MAX = int(os.getenv("COMPARE_PREWARM_MAX", "200"))
+# Opt-in via COMPARE_PREWARM_ON_INIT (read by app.main.init, which shouldn't import
+# this module otherwise) and bounded in time
+COMPARE_PREWARM_BUDGET_MS = float(os.getenv("COMPARE_PREWARM_BUDGET_MS", "3000"))
+
+
+def compare_key(product_ids: List[str], mode: str, include_trace: bool,
+                include_may_contain: bool) -> Hashable:
+    # Counts do not depend on product order, so A-vs-B and B-vs-A share an entry
+    return (tuple(sorted(product_ids)), mode, include_trace, include_may_contain)
+
+
+def compare_version(list_ids: Dict[str, Optional[str]], product_ids: List[str],
+                    rules_version: Optional[str] = None,
+                    hierarchy_version: Optional[Tuple[int, int]] = None) -> Hashable:
+    """
+    Everything a cached result depends on besides its key. A new ingredient list
+    version moves products.latest_ingredient_list_id, so the entry stops matching.
+    """
+    lists = tuple(list_ids.get(pid) for pid in sorted(product_ids))
+    return (lists, rules_version, hierarchy_version)
+
+
+def get_or_compute(key: Hashable, version: Hashable,
+                   compute: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+    body = COMPARE_CACHE.get(key, version)
+    if body is not None:
+        incr("compare_cache.hit")
+        return loads(body)
+    incr("compare_cache.miss")
+    result = compute()
+    COMPARE_CACHE.put(key, version, dumps(result), COMPARE_CACHE_TTL_S)
+    return result
+
+
+def load_prewarm_entries(path: str = COMPARE_PREWARM_PATH) -> List[Dict[str, Any]]:
+    try:
+        with open(path, "rb") as f:
+            entries = json.load(f)
+    except (OSError, ValueError):
+        return []
+    return [e for e in entries if isinstance(e, dict)][:COMPARE_PREWARM_MAX]
+
+
+def prewarm(compare: Callable[[Dict[str, Any]], Any],
+            budget_ms: float = COMPARE_PREWARM_BUDGET_MS) -> int:
+    """
+    Run `compare` for the bundled popular payloads in the calling thread until
+    they are done or budget_ms has passed; returns how many ran. Called from
+    app.main.init(), so the work happens in the Lambda init phase (or before a
+    SnapStart snapshot) instead of in a thread that would be frozen between
+    invocations and compete with live requests for pool connections.
+    """
+    deadline = time.monotonic() + budget_ms / 1000
+    done = 0
+    for payload in load_prewarm_entries():
+        if time.monotonic() >= deadline:
+            break
+        try:
+            compare(payload)
+        except ValueError:
+            # e.g. a product that no longer exists
+            incr("compare_cache.prewarm_errors")
+            continue
+        except Exception:
+            # Database unavailable: don't spend the rest of the budget on timeouts
+            incr("compare_cache.prewarm_errors")
+            break
+        done += 1
+        incr("compare_cache.prewarmed")
+    return done
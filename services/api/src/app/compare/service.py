@@ -1,7 +1,6 @@
-import json
 import re
 from collections import defaultdict
-from typing import Dict, List, Tuple, Any
+from typing import Any, Dict, List, Optional, Tuple
 
 from app.db import get_conn
 
@@ -12,31 +11,35 @@ UUID_RE = re.compile(
 def _norm(s: str) -> str:
     return " ".join(s.strip().lower().split())
 
-def _fetch_products(tokens: List[str]) -> List[Dict[str, Any]]:
-    # Returns rows with id/slug/name
+def _fetch_products(tokens: List[str]) -> Tuple[List[Dict[str, Any]], Dict[str, Optional[str]]]:
+    # Returns rows with id/slug/name, plus {product_id: latest_ingredient_list_id}
     by_id = [t for t in tokens if UUID_RE.match(t)]
     by_slug = [t for t in tokens if not UUID_RE.match(t)]
 
     products: Dict[str, Dict[str, Any]] = {}
+    list_ids: Dict[str, Optional[str]] = {}
 
     with get_conn() as conn:
         with conn.cursor() as cur:
             if by_id:
                 cur.execute(
                     """
-                    SELECT id, slug, name
+                    SELECT id, slug, name, latest_ingredient_list_id::text
                     FROM products
                     WHERE id = ANY(%s::uuid[])
                     """,
                     (by_id,),
                 )
                 for r in cur.fetchall():
-                    products[str(r[0])] = {"id": str(r[0]), "slug": r[1], "name": r[2], "token": str(r[0])}
+                    products[str(r[0])] = {
+                        "id": str(r[0]), "slug": r[1], "name": r[2], "token": str(r[0]),
+                    }
+                    list_ids[str(r[0])] = r[3]
 
             if by_slug:
                 cur.execute(
                     """
-                    SELECT id, slug, name
+                    SELECT id, slug, name, latest_ingredient_list_id::text
                     FROM products
                     WHERE slug = ANY(%s)
                     """,
@@ -44,6 +47,7 @@ def _fetch_products(tokens: List[str]) -> List[Dict[str, Any]]:
                 )
                 for r in cur.fetchall():
                     products[r[1]] = {"id": str(r[0]), "slug": r[1], "name": r[2], "token": r[1]}
+                    list_ids[str(r[0])] = r[3]
 
     # Preserve input order; drop unknowns
     ordered = []
@@ -54,11 +58,19 @@ def _fetch_products(tokens: List[str]) -> List[Dict[str, Any]]:
             # if token was uuid, key is uuid string; if slug, key is slug
             if UUID_RE.match(t) and t in products:
                 ordered.append(products[t])
-    return ordered
-
-def _fetch_latest_ingredient_items(product_ids: List[str], include_trace: bool, include_may_contain: bool) -> Dict[str, List[str]]:
+    return ordered, list_ids
+
+def _fetch_latest_ingredient_items(
+    product_ids: List[str],
+    include_trace: bool,
+    include_may_contain: bool,
+    rules_version: Optional[str] = None,
+) -> Dict[str, List[Tuple[str, str, Optional[str]]]]:
     """
-    Returns: {product_id: [raw_text...]} using latest ingredient_list version
+    Returns: {product_id: [(item_id, raw_text, cached_canonical_id)...]} using the
+    latest ingredient list. cached_canonical_id comes from
+    ingredient_item_canonical_map and is only set when it was resolved under
+    rules_version.
     """
     # Filter trace/may_contain based on flags
     clauses = []
@@ -68,29 +80,36 @@ def _fetch_latest_ingredient_items(product_ids: List[str], include_trace: bool,
         clauses.append("pi.is_may_contain = false")
     where_extra = (" AND " + " AND ".join(clauses)) if clauses else ""
 
+    map_join = ""
+    map_col = "NULL::text"
+    params: List[Any] = []
+    if rules_version:
+        map_join = """
+      LEFT JOIN ingredient_item_canonical_map m
+        ON m.ingredient_item_id = pi.id AND m.rules_version = %s"""
+        map_col = "m.canonical_id::text"
+        params.append(rules_version)
+    params.append(product_ids)
+
     sql = f"""
-      WITH latest AS (
-        SELECT DISTINCT ON (product_id)
-          product_id, id AS ingredient_list_id
-        FROM product_ingredient_lists
-        WHERE product_id = ANY(%s::uuid[])
-        ORDER BY product_id, version DESC
-      )
       SELECT
-        l.product_id,
-        pi.raw_text
-      FROM latest l
-      JOIN product_ingredient_items pi ON pi.ingredient_list_id = l.ingredient_list_id
-      WHERE 1=1 {where_extra}
-      ORDER BY l.product_id, pi.order_index ASC
+        p.id,
+        pi.id::text,
+        pi.raw_text,
+        {map_col}
+      FROM products p
+      JOIN product_ingredient_items pi
+        ON pi.ingredient_list_id = p.latest_ingredient_list_id{map_join}
+      WHERE p.id = ANY(%s::uuid[]) {where_extra}
+      ORDER BY p.id, pi.order_index ASC
     """
 
-    out: Dict[str, List[str]] = defaultdict(list)
+    out: Dict[str, List[Tuple[str, str, Optional[str]]]] = defaultdict(list)
     with get_conn() as conn:
         with conn.cursor() as cur:
-            cur.execute(sql, (product_ids,))
-            for product_id, raw_text in cur.fetchall():
-                out[str(product_id)].append(raw_text)
+            cur.execute(sql, tuple(params))
+            for product_id, item_id, raw_text, cached_id in cur.fetchall():
+                out[str(product_id)].append((item_id, raw_text, cached_id))
     return out
 
 def compare_products(payload: Dict[str, Any]) -> Dict[str, Any]:
@@ -106,25 +125,65 @@ def compare_products(payload: Dict[str, Any]) -> Dict[str, Any]:
     include_trace = bool(payload.get("include_trace", False))
     include_may_contain = bool(payload.get("include_may_contain", False))
 
-    products = _fetch_products(tokens)
+    products, list_ids = _fetch_products(tokens)
     if len(products) < 2:
         raise ValueError("At least 2 valid products are required")
 
     product_ids = [p["id"] for p in products]
-    items_by_product = _fetch_latest_ingredient_items(product_ids, include_trace, include_may_contain)
 
-    rules = None
+    rules = closure = None
+    if mode == "canonical":
+        from app.ingredients.hierarchy import get_closure
+        from app.ingredients.resolve import load_compiled_rules
+        rules = load_compiled_rules()
+        closure = get_closure()
+
+    from app.compare.cache import compare_key, compare_version, get_or_compute
+
+    result = get_or_compute(
+        compare_key(product_ids, mode, include_trace, include_may_contain),
+        compare_version(
+            list_ids, product_ids,
+            rules.version if rules else None, closure.version if closure else None,
+        ),
+        lambda: _compute(product_ids, mode, include_trace, include_may_contain, rules, closure),
+    )
+
+    return {
+        "product_count": len(product_ids),
+        "products": products,
+        "in_all": result["in_all"],
+        "in_some": result["in_some"],
+        "notes": {
+            "mode": mode,
+            "normalization": "trim+lower+collapse_spaces",
+            "trace_included": include_trace,
+            "may_contain_included": include_may_contain,
+        },
+    }
+
+def _compute(product_ids: List[str], mode: str, include_trace: bool, include_may_contain: bool,
+             rules, closure) -> Dict[str, Any]:
     if mode == "canonical":
-        from app.ingredients.resolve import load_rules, resolve_to_canonical, norm as norm_ing
-        rules = load_rules()
+        from app.ingredients.mapping import record_mappings
+        from app.ingredients.resolve import norm as norm_ing
+
+    items_by_product = _fetch_latest_ingredient_items(
+        product_ids, include_trace, include_may_contain,
+        rules_version=rules.version if rules else None,
+    )
+    # Live resolutions to persist in ingredient_item_canonical_map
+    resolved: List[Tuple[str, str, str, str]] = []
 
     # Build presence counts on normalized ingredient text
     counts: Dict[str, int] = defaultdict(int)
     display: Dict[str, str] = {}
 
-    for pid in product_ids:
+    # Sorted so the result (including which spelling is displayed) does not
+    # depend on request order; it is cached under the sorted ids.
+    for pid in sorted(product_ids):
         seen = set()
-        for raw in items_by_product.get(pid, []):
+        for item_id, raw, cached_id in items_by_product.get(pid, []):
             raw_clean = raw.strip()
             if not raw_clean:
                 continue
@@ -134,7 +193,13 @@ def compare_products(payload: Dict[str, Any]) -> Dict[str, Any]:
                 disp = raw_clean
 
             else:
-                matched = resolve_to_canonical(raw_clean, rules)
+                if cached_id and cached_id in rules.names:
+                    matched = (cached_id, rules.names[cached_id])
+                else:
+                    hit = rules.match(raw_clean)
+                    matched = hit[:2] if hit else None
+                    if hit:
+                        resolved.append((item_id, hit[0], hit[2], rules.version))
                 if matched:
                     canonical_id, canonical_name = matched
                     key = canonical_id
@@ -148,6 +213,16 @@ def compare_products(payload: Dict[str, Any]) -> Dict[str, Any]:
                 counts[key] += 1
                 display.setdefault(key, disp)
 
+            if mode == "canonical" and matched:
+                # A product containing Chicken also contains Poultry
+                for ancestor_id in closure.ancestors_of(key):
+                    if ancestor_id not in seen:
+                        seen.add(ancestor_id)
+                        counts[ancestor_id] += 1
+                        display.setdefault(ancestor_id, closure.names.get(ancestor_id, ancestor_id))
+
+    if resolved:
+        record_mappings(resolved)
 
     total = len(product_ids)
 
@@ -160,19 +235,9 @@ def compare_products(payload: Dict[str, Any]) -> Dict[str, Any]:
             "percent": round(c / total, 4),
         })
 
+    in_all = sorted([x for x in scored if x["in_count"] == total],
+                    key=lambda x: x["ingredient"].lower())
+    in_some = sorted([x for x in scored if 0 < x["in_count"] < total],
+                     key=lambda x: (-x["in_count"], x["ingredient"].lower()))
 
-    in_all = sorted([x for x in scored if x["in_count"] == total], key=lambda x: x["ingredient"].lower())
-    in_some = sorted([x for x in scored if 0 < x["in_count"] < total], key=lambda x: (-x["in_count"], x["ingredient"].lower()))
-
-    return {
-        "product_count": total,
-        "products": products,
-        "in_all": in_all,
-        "in_some": in_some,
-        "notes": {
-            "mode": mode,
-            "normalization": "trim+lower+collapse_spaces",
-            "trace_included": include_trace,
-            "may_contain_included": include_may_contain,
-        },
-    }
+    return {"in_all": in_all, "in_some": in_some}
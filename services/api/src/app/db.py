@@ -1,24 +1,50 @@
-import json
 import os
-from functools import lru_cache
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Iterator, List, Optional, Tuple
 
-import boto3
-import psycopg
+from app.db_secret import DB_SECRET
+from app.observability import incr
 
+# psycopg and boto3 are imported on first DB use, not at import time, so routes
+# that never touch the database (and cold starts) don't pay for them.
+if TYPE_CHECKING:
+    import psycopg
 
-@lru_cache
-def _get_db_secret() -> dict:
-    secret_arn = os.environ["DB_SECRET_ARN"]
-    client = boto3.client(
-        "secretsmanager",
-        region_name=os.environ.get("AWS_REGION", "us-west-2"),
-    )
-    resp = client.get_secret_value(SecretId=secret_arn)
-    return json.loads(resp["SecretString"])
+
+POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "4"))
+# Idle connections older than this are closed (down to POOL_MIN_SIZE).
+POOL_MAX_IDLE_S = float(os.getenv("DB_POOL_MAX_IDLE_S", "300"))
+# Connections idle for longer than this are pinged before being handed out.
+POOL_CHECK_IDLE_S = float(os.getenv("DB_POOL_CHECK_IDLE_S", "5"))
+POOL_TIMEOUT_S = float(os.getenv("DB_POOL_TIMEOUT_S", "5"))
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+def preload() -> None:
+    """Import the DB client libraries without connecting (see app.main.init)."""
+    import boto3  # noqa: F401
+    import psycopg  # noqa: F401
 
 
-def get_conn():
-    secret = _get_db_secret()
+# Login rejected: bad password (e.g. the secret was rotated) or unknown role
+_AUTH_SQLSTATES = ("28P01", "28000")
+
+
+def _is_auth_error(e: Exception) -> bool:
+    if getattr(e, "sqlstate", None) in _AUTH_SQLSTATES:
+        return True
+    return "password authentication failed" in str(e)
+
+
+def _open(secret: dict) -> "psycopg.Connection":
+    import psycopg
+
     return psycopg.connect(
         host=os.environ["DB_HOST"],
         dbname=os.environ["DB_NAME"],
@@ -26,3 +52,214 @@ def get_conn():
         password=secret["password"],
         connect_timeout=5,
     )
+
+
+def _connect() -> "psycopg.Connection":
+    import psycopg
+
+    secret = DB_SECRET.get()
+    try:
+        return _open(secret)
+    except psycopg.OperationalError as e:
+        if not _is_auth_error(e):
+            raise
+        # The cached secret may predate a rotation: refetch once, and retry only
+        # if it actually changed
+        fresh = DB_SECRET.refresh()
+        if fresh == secret:
+            raise
+    incr("db_secret.rotated")
+    pool = _POOL
+    if pool is not None:
+        # Idle connections were opened with the old credentials
+        pool.close()
+    return _open(fresh)
+
+
+def _is_usable(conn: "psycopg.Connection") -> bool:
+    return not conn.closed and not conn.broken
+
+
+def _ping(conn: "psycopg.Connection") -> bool:
+    import psycopg
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except psycopg.Error:
+        return False
+
+
+def _close_quietly(conn: "psycopg.Connection") -> None:
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+class ConnectionPool:
+    """
+    Small thread-safe pool that lives for the lifetime of the Lambda container.
+
+    Counters (via app.observability): db_pool.hit, db_pool.miss, db_pool.wait_ms,
+    db_pool.reconnect, db_pool.discarded, db_pool.expired.
+    """
+
+    def __init__(self, min_size: int = POOL_MIN_SIZE, max_size: int = POOL_MAX_SIZE,
+                 max_idle_s: float = POOL_MAX_IDLE_S, check_idle_s: float = POOL_CHECK_IDLE_S,
+                 timeout_s: float = POOL_TIMEOUT_S):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError("invalid pool size bounds")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_idle_s = max_idle_s
+        self.check_idle_s = check_idle_s
+        self.timeout_s = timeout_s
+
+        # LIFO stack of (conn, last_used) so the warmest connection is reused first
+        self._idle: List[Tuple["psycopg.Connection", float]] = []
+        self._size = 0
+        self._cond = threading.Condition()
+
+    def open(self) -> None:
+        while True:
+            with self._cond:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = _connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+
+    def getconn(self) -> "psycopg.Connection":
+        start = time.perf_counter()
+        deadline = time.monotonic() + self.timeout_s
+        conn: Optional["psycopg.Connection"] = None
+        idle_for = 0.0
+
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    idle_for = now - last_used
+                    if idle_for > self.max_idle_s and self._size > self.min_size:
+                        self._size -= 1
+                        _close_quietly(conn)
+                        conn = None
+                        incr("db_pool.expired")
+                        continue
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - now
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    incr("db_pool.timeout")
+                    raise PoolTimeout(f"no connection available after {self.timeout_s}s")
+
+        if conn is not None:
+            incr("db_pool.hit")
+            if not _is_usable(conn) or (idle_for > self.check_idle_s and not _ping(conn)):
+                incr("db_pool.reconnect")
+                _close_quietly(conn)
+                conn = None
+        else:
+            incr("db_pool.miss")
+
+        if conn is None:
+            try:
+                conn = _connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+
+        incr("db_pool.wait_ms", (time.perf_counter() - start) * 1000)
+        return conn
+
+    def putconn(self, conn: "psycopg.Connection") -> None:
+        import psycopg
+        from psycopg import pq
+
+        if _is_usable(conn):
+            try:
+                if conn.info.transaction_status != pq.TransactionStatus.IDLE:
+                    conn.rollback()
+            except psycopg.Error:
+                pass
+
+        with self._cond:
+            if _is_usable(conn):
+                self._idle.append((conn, time.monotonic()))
+            else:
+                self._size -= 1
+                incr("db_pool.discarded")
+                _close_quietly(conn)
+            self._cond.notify()
+
+    def close(self) -> None:
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for conn, _ in idle:
+            _close_quietly(conn)
+
+
+_POOL: Optional[ConnectionPool] = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                pool = ConnectionPool()
+                pool.open()
+                _POOL = pool
+    return _POOL
+
+
+def reset() -> None:
+    """Drop the pool and cached credentials, e.g. after a snapshot restore."""
+    global _POOL
+    with _POOL_LOCK:
+        pool, _POOL = _POOL, None
+    if pool is not None:
+        pool.close()
+    DB_SECRET.clear()
+
+
+@contextmanager
+def get_conn() -> Iterator["psycopg.Connection"]:
+    # Same contract as `with psycopg.connect() as conn`: commit on success, roll back
+    # on error. The connection goes back to the pool instead of being closed.
+    import psycopg
+    from psycopg import pq
+
+    pool = get_pool()
+    conn = pool.getconn()
+    try:
+        yield conn
+        if _is_usable(conn) and conn.info.transaction_status == pq.TransactionStatus.INTRANS:
+            conn.commit()
+    except BaseException:
+        if _is_usable(conn):
+            try:
+                conn.rollback()
+            except psycopg.Error:
+                pass
+        raise
+    finally:
+        pool.putconn(conn)
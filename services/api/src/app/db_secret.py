@@ -0,0 +1,109 @@
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from app.observability import incr
+
+# How long a fetched secret is used before it is re-read. Rotation is also picked
+# up immediately by app.db, which refetches once when a login is rejected.
+DB_SECRET_TTL_S = float(os.getenv("DB_SECRET_TTL_S", "900"))
+
+# A provider returns {"username": ..., "password": ...}
+SecretProvider = Callable[[], Dict[str, str]]
+
+
+def secrets_manager_provider(secret_arn: str, region: Optional[str] = None) -> SecretProvider:
+    def fetch() -> Dict[str, str]:
+        import boto3
+
+        client = boto3.client(
+            "secretsmanager",
+            region_name=region or os.environ.get("AWS_REGION", "us-west-2"),
+        )
+        resp = client.get_secret_value(SecretId=secret_arn)
+        return json.loads(resp["SecretString"])
+    return fetch
+
+
+def file_provider(path: str) -> SecretProvider:
+    # Same JSON shape as the Secrets Manager secret; re-read on every refresh
+    def fetch() -> Dict[str, str]:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return fetch
+
+
+def env_provider(user_var: str = "DB_USER", password_var: str = "DB_PASSWORD") -> SecretProvider:
+    def fetch() -> Dict[str, str]:
+        return {"username": os.environ[user_var], "password": os.environ[password_var]}
+    return fetch
+
+
+def provider_from_env() -> SecretProvider:
+    """
+    DB_SECRET_FILE (local runs), then DB_SECRET_ARN (deployed), then plain
+    DB_USER/DB_PASSWORD.
+    """
+    if os.getenv("DB_SECRET_FILE"):
+        return file_provider(os.environ["DB_SECRET_FILE"])
+    if os.getenv("DB_SECRET_ARN"):
+        return secrets_manager_provider(os.environ["DB_SECRET_ARN"])
+    return env_provider()
+
+
+class CachedSecret:
+    """
+    Secret cached for `ttl_s` and refreshed lazily by the first caller after it
+    expires (a Lambda container is frozen between invokes, so a background timer
+    would not fire reliably). If a refresh fails, the previous value keeps being
+    served and the next call tries again.
+
+    Counters: db_secret.fetch, db_secret.refresh_errors.
+    """
+
+    def __init__(self, provider: Optional[SecretProvider] = None, ttl_s: float = DB_SECRET_TTL_S):
+        self._provider = provider
+        self.ttl_s = ttl_s
+        self._value: Optional[Dict[str, str]] = None
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> Dict[str, str]:
+        value = self._value
+        if value is not None and time.monotonic() - self._fetched_at < self.ttl_s:
+            return value
+
+        with self._lock:
+            if self._value is not None and time.monotonic() - self._fetched_at < self.ttl_s:
+                return self._value
+            try:
+                return self._fetch()
+            except Exception:
+                if self._value is None:
+                    raise
+                incr("db_secret.refresh_errors")
+                return self._value
+
+    def refresh(self) -> Dict[str, str]:
+        """Fetch now, regardless of age."""
+        with self._lock:
+            return self._fetch()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._value = None
+            self._fetched_at = 0.0
+
+    def _fetch(self) -> Dict[str, str]:
+        if self._provider is None:
+            self._provider = provider_from_env()
+        value = self._provider()
+        incr("db_secret.fetch")
+        self._value = value
+        self._fetched_at = time.monotonic()
+        return value
+
+
+DB_SECRET = CachedSecret()
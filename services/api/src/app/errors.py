@@ -1,5 +1,7 @@
 from typing import Any, Dict, List, Optional
 
+from app.serialization import dumps
+
 
 def error_response(code: str, message: str, request_id: str, status_code: int = 400,
                    details: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
@@ -19,5 +21,5 @@ def error_response(code: str, message: str, request_id: str, status_code: int =
             "content-type": "application/json",
             "x-request-id": request_id,
         },
-        "body": __import__("json").dumps(body, ensure_ascii=False),
+        "body": dumps(body),
     }
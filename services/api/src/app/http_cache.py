@@ -0,0 +1,77 @@
+import hashlib
+from typing import Any, Dict, Optional
+
+from app.serialization import dumps_canonical
+
+# Cache-Control per route. Anything not listed gets no Cache-Control header.
+CACHE_CONTROL = {
+    "health": "no-store",
+    "meta_symptoms": "public, max-age=86400",
+    "catalog_products": "public, max-age=60, stale-while-revalidate=300",
+    "catalog_product": "public, max-age=300, stale-while-revalidate=600",
+    "catalog_similar": "public, max-age=300, stale-while-revalidate=600",
+    "ingredients_suggest": "public, max-age=300",
+    "compare": "public, max-age=300, stale-while-revalidate=600",
+}
+
+
+def make_etag(version: Optional[int], route: str, params: Any) -> Optional[str]:
+    """
+    Strong ETag from the catalog version plus the normalized request parameters.
+    Two requests with the same ETag get byte-identical bodies until the catalog
+    version changes. None when the version is unknown.
+    """
+    if version is None:
+        return None
+    digest = hashlib.sha256(dumps_canonical([route, params])).hexdigest()[:24]
+    return f'"v{version}-{digest}"'
+
+
+def content_etag(body: str) -> str:
+    return '"c-' + hashlib.sha256(body.encode()).hexdigest()[:24] + '"'
+
+
+def get_header(headers: Optional[Dict[str, str]], name: str) -> Optional[str]:
+    if not headers:
+        return None
+    value = headers.get(name)
+    if value is not None:
+        return value
+    name = name.lower()
+    for k, v in headers.items():
+        if k.lower() == name:
+            return v
+    return None
+
+
+def if_none_match(
+    headers: Optional[Dict[str, str]], etag: Optional[str], match_any: bool = True,
+) -> bool:
+    # Weak comparison, as RFC 9110 prescribes for If-None-Match. "*" matches any
+    # current representation, so routes that may 404 pass match_any=False until
+    # they know the resource exists.
+    if not etag:
+        return False
+    header = get_header(headers, "if-none-match")
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            if match_any:
+                return True
+            continue
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def cache_headers(route: str, etag: Optional[str]) -> Dict[str, str]:
+    out = {}
+    if etag:
+        out["etag"] = etag
+    if route in CACHE_CONTROL:
+        out["cache-control"] = CACHE_CONTROL[route]
+    return out
@@ -0,0 +1,480 @@
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple
+
+from app.db import get_conn
+from app.ingredients.mapping import MATCH_CONFIDENCE
+from app.ingredients.resolve import CompiledRules, load_compiled_rules
+
+CHUNK_SIZE = int(os.getenv("BACKFILL_CHUNK_SIZE", "5000"))
+MAX_CHUNK_SIZE = 50000
+# Stop starting new chunks once less than this (or twice the last chunk's duration)
+# is left before the Lambda deadline.
+RESERVE_MS = int(os.getenv("BACKFILL_RESERVE_MS", "2000"))
+
+JOB_KIND = "canonical_backfill"
+# Re-canonicalize after a synonym rules change: also revisits items mapped under
+# another rules_version (see SELECT_STALE_SQL)
+RECANONICALIZE_KIND = "canonical_refresh"
+
+# Mappings cached in ingredient_item_canonical_map under the current rules are reused
+SELECT_UNMAPPED_SQL = """
+  SELECT pi.id::text, pi.raw_text, m.canonical_id::text
+  FROM product_ingredient_items pi
+  LEFT JOIN ingredient_item_canonical_map m
+    ON m.ingredient_item_id = pi.id AND m.rules_version = %s
+  WHERE pi.canonical_id IS NULL
+    AND (%s::uuid IS NULL OR pi.id > %s::uuid)
+  ORDER BY pi.id
+"""
+
+# Unmapped items, plus mapped items whose ingredient_item_canonical_map row was
+# made under other rules or disagrees with the item (compare writes map rows for
+# the current rules without touching items). Items with a canonical_id but no
+# map row were set by hand and are left alone.
+SELECT_STALE_SQL = """
+  SELECT pi.id::text, pi.raw_text,
+         CASE WHEN m.rules_version = %s THEN m.canonical_id::text END
+  FROM product_ingredient_items pi
+  LEFT JOIN ingredient_item_canonical_map m ON m.ingredient_item_id = pi.id
+  WHERE (
+      pi.canonical_id IS NULL
+      OR (m.ingredient_item_id IS NOT NULL
+          AND (m.rules_version IS DISTINCT FROM %s OR m.canonical_id <> pi.canonical_id))
+    )
+    AND (%s::uuid IS NULL OR pi.id > %s::uuid)
+  ORDER BY pi.id
+"""
+
+CREATE_STAGING_SQL = """
+  CREATE TEMP TABLE IF NOT EXISTS canonical_backfill_stage (
+    item_id uuid PRIMARY KEY,
+    canonical_id uuid NULL,
+    matched_by text NULL,
+    match_confidence smallint NULL
+  ) ON COMMIT DELETE ROWS
+"""
+
+APPLY_STAGING_SQL = """
+  UPDATE product_ingredient_items pi
+  SET canonical_id = s.canonical_id
+  FROM canonical_backfill_stage s
+  WHERE pi.id = s.item_id
+    AND pi.canonical_id IS NULL
+    AND s.canonical_id IS NOT NULL
+"""
+
+# Re-canonicalization overwrites stale values, and clears them (canonical_id
+# NULL in the stage) when the current rules no longer match the item at all
+APPLY_STAGING_OVERWRITE_SQL = """
+  UPDATE product_ingredient_items pi
+  SET canonical_id = s.canonical_id
+  FROM canonical_backfill_stage s
+  WHERE pi.id = s.item_id
+    AND pi.canonical_id IS DISTINCT FROM s.canonical_id
+"""
+
+DELETE_UNMATCHED_MAP_SQL = """
+  DELETE FROM ingredient_item_canonical_map m
+  USING canonical_backfill_stage s
+  WHERE m.ingredient_item_id = s.item_id
+    AND s.canonical_id IS NULL
+"""
+
+# Record fresh resolutions (matched_by set) in the mapping cache
+UPSERT_MAP_SQL = """
+  INSERT INTO ingredient_item_canonical_map
+    (ingredient_item_id, canonical_id, match_confidence, matched_by, rules_version)
+  SELECT s.item_id, s.canonical_id, s.match_confidence, s.matched_by, %s
+  FROM canonical_backfill_stage s
+  WHERE s.matched_by IS NOT NULL AND s.canonical_id IS NOT NULL
+  ON CONFLICT (ingredient_item_id) DO UPDATE
+  SET canonical_id = EXCLUDED.canonical_id,
+      match_confidence = EXCLUDED.match_confidence,
+      matched_by = EXCLUDED.matched_by,
+      rules_version = EXCLUDED.rules_version,
+      created_at = now()
+"""
+
+# Derived product columns (migrations 003, 004, 008) are filled in by keyset
+# sweeps over products rather than by one UPDATE in the migration file. Each
+# statement takes a chunk of product ids.
+LATEST_LIST_SWEEP_SQL = """
+  UPDATE products p
+  SET latest_ingredient_list_id = l.id
+  FROM (
+    SELECT DISTINCT ON (product_id) product_id, id
+    FROM product_ingredient_lists
+    WHERE product_id = ANY(%s::uuid[])
+    ORDER BY product_id, version DESC
+  ) l
+  WHERE l.product_id = p.id
+    AND p.latest_ingredient_list_id IS DISTINCT FROM l.id
+"""
+
+CANONICAL_IDS_SWEEP_SQL = """
+  UPDATE products p
+  SET canonical_ids = x.ids
+  FROM (
+    SELECT id, product_canonical_ids(latest_ingredient_list_id) AS ids
+    FROM products
+    WHERE id = ANY(%s::uuid[])
+  ) x
+  WHERE p.id = x.id
+    AND p.canonical_ids IS DISTINCT FROM x.ids
+"""
+
+SEARCH_SWEEP_SQL = """
+  UPDATE products p
+  SET search_tsv = x.tsv, search_text = x.text
+  FROM (
+    SELECT id,
+           product_search_tsv(name, brand_id, latest_ingredient_list_id) AS tsv,
+           product_search_text(name, brand_id) AS text
+    FROM products
+    WHERE id = ANY(%s::uuid[])
+  ) x
+  WHERE p.id = x.id
+    AND (p.search_tsv IS DISTINCT FROM x.tsv OR p.search_text IS DISTINCT FROM x.text)
+"""
+
+PRODUCT_SWEEPS = {
+    "latest_ingredient_list": LATEST_LIST_SWEEP_SQL,
+    "product_canonical_ids": CANONICAL_IDS_SWEEP_SQL,
+    "product_search": SEARCH_SWEEP_SQL,
+}
+# Product sweeps call per-product SQL functions, so their chunks are smaller
+PRODUCT_CHUNK_SIZE = int(os.getenv("BACKFILL_PRODUCT_CHUNK_SIZE", "1000"))
+
+# The steps of one /admin/migrate job, in order. The latest list has to be set
+# before canonical_ids and search_tsv are derived from it; the item backfill
+# runs last and keeps canonical_ids current through the 004 triggers.
+JOB_STEPS = (*PRODUCT_SWEEPS, JOB_KIND)
+# Everything a continuation token may refer to
+JOB_KINDS = (*JOB_STEPS, RECANONICALIZE_KIND)
+
+PRODUCT_BATCH_SQL = """
+  SELECT id::text
+  FROM products
+  WHERE (%s::uuid IS NULL OR id > %s::uuid)
+  ORDER BY id
+  LIMIT %s
+"""
+
+CREATE_JOB_SQL = """
+  INSERT INTO backfill_jobs (kind, last_item_id)
+  VALUES (%s, %s::uuid)
+  RETURNING id::text
+"""
+
+LOAD_JOB_SQL = """
+  SELECT kind, last_item_id::text, status
+  FROM backfill_jobs
+  WHERE id = %s::uuid AND kind = ANY(%s)
+"""
+
+SAVE_JOB_SQL = """
+  UPDATE backfill_jobs
+  SET last_item_id = %s::uuid,
+      status = %s,
+      scanned = scanned + %s,
+      updated = updated + %s,
+      updated_at = now()
+  WHERE id = %s::uuid
+"""
+
+
+class JobNotFound(ValueError):
+    pass
+
+
+def chunk_size_from(value) -> Optional[int]:
+    """
+    Chunk size from a request payload, clamped to 1..MAX_CHUNK_SIZE; None (each
+    step's default) when not given.
+    """
+    if value is None or value == "":
+        return None
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("chunk_size must be an integer")
+    return max(1, min(size, MAX_CHUNK_SIZE))
+
+
+def _uuid_or_none(value, name: str) -> Optional[str]:
+    if value is None:
+        return None
+    try:
+        return str(uuid.UUID(str(value)))
+    except ValueError:
+        raise ValueError(f"{name} must be a UUID")
+
+
+@dataclass
+class BackfillResult:
+    scanned: int = 0
+    updated: int = 0
+    chunks: int = 0
+    # Highest item (or, for product sweeps, product) id whose chunk has been
+    # committed; pass back as after_id to resume
+    last_item_id: Optional[str] = None
+    done: bool = False
+    job_id: Optional[str] = None
+    step: str = JOB_KIND
+    elapsed_s: float = 0.0
+    started: float = field(default_factory=time.perf_counter, repr=False)
+
+    @property
+    def rows_per_s(self) -> float:
+        return round(self.scanned / self.elapsed_s, 1) if self.elapsed_s else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "step": self.step,
+            "scanned": self.scanned,
+            "backfilled": self.updated,
+            "chunks": self.chunks,
+            "last_item_id": self.last_item_id,
+            "done": self.done,
+            # Opaque to callers: re-invoke with it to continue an unfinished job
+            "continuation_token": None if self.done else self.job_id,
+            "elapsed_ms": int(self.elapsed_s * 1000),
+            "rows_per_s": self.rows_per_s,
+        }
+
+
+def _resolve_chunk(rows: List[Tuple[str, str, Optional[str]]], rules: CompiledRules,
+                   keep_unmatched: bool = False,
+                   ) -> List[Tuple[str, Optional[str], Optional[str], Optional[int]]]:
+    # (item_id, canonical_id, matched_by, confidence); matched_by is None for cached
+    # mappings, canonical_id None for unmatched items when keep_unmatched
+    out = []
+    for item_id, raw_text, cached_id in rows:
+        if cached_id:
+            out.append((item_id, cached_id, None, None))
+            continue
+        hit = rules.match(raw_text)
+        if hit:
+            out.append((item_id, hit[0], hit[2], MATCH_CONFIDENCE.get(hit[2], 50)))
+        elif keep_unmatched:
+            out.append((item_id, None, None, None))
+    return out
+
+
+def _write_chunk(conn, matches: List[Tuple[str, Optional[str], Optional[str], Optional[int]]],
+                 rules_version: str, overwrite: bool = False) -> int:
+    # One COPY + one joined UPDATE per chunk instead of an UPDATE per row
+    with conn.cursor() as cur:
+        cur.execute(CREATE_STAGING_SQL)
+        with cur.copy(
+            "COPY canonical_backfill_stage"
+            " (item_id, canonical_id, matched_by, match_confidence) FROM STDIN"
+        ) as copy:
+            for row in matches:
+                copy.write_row(row)
+        cur.execute(APPLY_STAGING_OVERWRITE_SQL if overwrite else APPLY_STAGING_SQL)
+        updated = cur.rowcount
+        cur.execute(UPSERT_MAP_SQL, (rules_version,))
+        if overwrite:
+            cur.execute(DELETE_UNMATCHED_MAP_SQL)
+        return updated
+
+
+def _save_job(cur, result: BackfillResult, scanned: int, updated: int) -> None:
+    cur.execute(SAVE_JOB_SQL, (
+        result.last_item_id,
+        "done" if result.done else "running",
+        scanned,
+        updated,
+        result.job_id,
+    ))
+
+
+def start_job(kind: str = JOB_KIND, after_id: Optional[str] = None) -> str:
+    after_id = _uuid_or_none(after_id, "after_id")
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(CREATE_JOB_SQL, (kind, after_id))
+            job_id = cur.fetchone()[0]
+        conn.commit()
+    return job_id
+
+
+def load_job(job_id: str) -> Tuple[str, Optional[str], bool]:
+    """Returns (kind, last_item_id, done) for a job started by start_job()."""
+    try:
+        job_id = str(uuid.UUID(str(job_id)))
+    except ValueError:
+        raise JobNotFound(f"malformed continuation token: {job_id}")
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(LOAD_JOB_SQL, (job_id, list(JOB_KINDS)))
+            row = cur.fetchone()
+    if not row:
+        raise JobNotFound(f"unknown continuation token: {job_id}")
+    return row[0], row[1], row[2] == "done"
+
+
+def backfill_canonical(
+    after_id: Optional[str] = None,
+    chunk_size: int = CHUNK_SIZE,
+    on_chunk: Optional[Callable[[BackfillResult], None]] = None,
+    job_id: Optional[str] = None,
+    time_left_ms: Optional[Callable[[], int]] = None,
+    recanonicalize: bool = False,
+) -> BackfillResult:
+    """
+    Resolve canonical_id for unmapped items, streaming them in id order from a
+    server-side cursor and committing each chunk separately. With recanonicalize,
+    items mapped under other rules are resolved again and their canonical_id
+    overwritten (or cleared if nothing matches any more); the 004 triggers then
+    bring products.canonical_ids up to date.
+
+    With job_id, the high-water mark is saved to backfill_jobs in the same
+    transaction as each chunk. With time_left_ms (e.g. the Lambda context's
+    get_remaining_time_in_millis), no new chunk is started once the deadline is
+    close; the result is then returned with done=False.
+    """
+    rules = load_compiled_rules()
+    result = BackfillResult(last_item_id=after_id, job_id=job_id,
+                            step=RECANONICALIZE_KIND if recanonicalize else JOB_KIND)
+    chunk_ms = 0.0
+
+    with get_conn() as read_conn, get_conn() as write_conn:
+        with read_conn.cursor(name="canonical_backfill") as src:
+            src.itersize = chunk_size
+            if recanonicalize:
+                src.execute(SELECT_STALE_SQL, (rules.version, rules.version, after_id, after_id))
+            else:
+                src.execute(SELECT_UNMAPPED_SQL, (rules.version, after_id, after_id))
+
+            while True:
+                if time_left_ms is not None and time_left_ms() < max(RESERVE_MS, 2 * chunk_ms):
+                    break
+
+                chunk_start = time.perf_counter()
+                rows = src.fetchmany(chunk_size)
+                if not rows:
+                    result.done = True
+                    if job_id:
+                        with write_conn.cursor() as cur:
+                            _save_job(cur, result, 0, 0)
+                        write_conn.commit()
+                    break
+
+                matches = _resolve_chunk(rows, rules, keep_unmatched=recanonicalize)
+                updated = 0
+                if matches:
+                    updated = _write_chunk(write_conn, matches, rules.version,
+                                           overwrite=recanonicalize)
+
+                result.scanned += len(rows)
+                result.updated += updated
+                result.chunks += 1
+                result.last_item_id = rows[-1][0]
+                if job_id:
+                    with write_conn.cursor() as cur:
+                        _save_job(cur, result, len(rows), updated)
+                write_conn.commit()
+
+                chunk_ms = (time.perf_counter() - chunk_start) * 1000
+                result.elapsed_s = time.perf_counter() - result.started
+                if on_chunk:
+                    on_chunk(result)
+
+    result.elapsed_s = time.perf_counter() - result.started
+    return result
+
+
+def backfill_products(
+    kind: str,
+    after_id: Optional[str] = None,
+    chunk_size: int = PRODUCT_CHUNK_SIZE,
+    on_chunk: Optional[Callable[[BackfillResult], None]] = None,
+    job_id: Optional[str] = None,
+    time_left_ms: Optional[Callable[[], int]] = None,
+) -> BackfillResult:
+    """
+    One of the PRODUCT_SWEEPS over all products in id order, a chunk per
+    transaction, with the same job bookkeeping and deadline handling as
+    backfill_canonical.
+    """
+    sweep_sql = PRODUCT_SWEEPS[kind]
+    result = BackfillResult(last_item_id=after_id, job_id=job_id, step=kind)
+    chunk_ms = 0.0
+
+    with get_conn() as conn:
+        while True:
+            if time_left_ms is not None and time_left_ms() < max(RESERVE_MS, 2 * chunk_ms):
+                break
+
+            chunk_start = time.perf_counter()
+            with conn.cursor() as cur:
+                last = result.last_item_id
+                cur.execute(PRODUCT_BATCH_SQL, (last, last, chunk_size))
+                ids = [r[0] for r in cur.fetchall()]
+                if not ids:
+                    result.done = True
+                    if job_id:
+                        _save_job(cur, result, 0, 0)
+                    conn.commit()
+                    break
+
+                cur.execute(sweep_sql, (ids,))
+                updated = cur.rowcount
+                result.scanned += len(ids)
+                result.updated += updated
+                result.chunks += 1
+                result.last_item_id = ids[-1]
+                if job_id:
+                    _save_job(cur, result, len(ids), updated)
+            conn.commit()
+
+            chunk_ms = (time.perf_counter() - chunk_start) * 1000
+            result.elapsed_s = time.perf_counter() - result.started
+            if on_chunk:
+                on_chunk(result)
+
+    result.elapsed_s = time.perf_counter() - result.started
+    return result
+
+
+def run_job(
+    job_id: str,
+    chunk_size: Optional[int] = None,
+    on_chunk: Optional[Callable[[BackfillResult], None]] = None,
+    time_left_ms: Optional[Callable[[], int]] = None,
+) -> BackfillResult:
+    """
+    Continue job `job_id` and the JOB_STEPS after it until all are done or the
+    deadline is close. Each step is its own backfill_jobs row; the returned
+    result's job_id is the one to resume with. A RECANONICALIZE_KIND job is a
+    single step.
+    """
+    kind, after_id, done = load_job(job_id)
+    while True:
+        if done:
+            result = BackfillResult(last_item_id=after_id, done=True, job_id=job_id, step=kind)
+        elif kind in (JOB_KIND, RECANONICALIZE_KIND):
+            result = backfill_canonical(after_id, chunk_size or CHUNK_SIZE, on_chunk,
+                                        job_id, time_left_ms,
+                                        recanonicalize=kind == RECANONICALIZE_KIND)
+        else:
+            result = backfill_products(kind, after_id, chunk_size or PRODUCT_CHUNK_SIZE,
+                                       on_chunk, job_id, time_left_ms)
+        if not result.done or kind not in JOB_STEPS:
+            return result
+
+        i = JOB_STEPS.index(kind) + 1
+        if i == len(JOB_STEPS):
+            return result
+        if time_left_ms is not None and time_left_ms() < RESERVE_MS:
+            # Out of time between steps: hand back a fresh job for the next one
+            result.job_id, result.step, result.done = start_job(JOB_STEPS[i]), JOB_STEPS[i], False
+            result.last_item_id = None
+            return result
+        kind, after_id, done = JOB_STEPS[i], None, False
+        job_id = start_job(kind)
@@ -0,0 +1,129 @@
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from app.db import get_conn
+
+# How often (at most) a warm container checks ingredient_hierarchy for changes
+HIERARCHY_TTL_S = float(os.getenv("HIERARCHY_TTL_S", "60"))
+
+EDGES_SQL = """
+  SELECT h.parent_id::text, h.child_id::text, p.name, c.name
+  FROM ingredient_hierarchy h
+  JOIN ingredient_canonical p ON p.id = h.parent_id
+  JOIN ingredient_canonical c ON c.id = h.child_id
+"""
+
+# Cheap change detector: any insert/delete/rewire changes count or hash sum
+FINGERPRINT_SQL = """
+  SELECT count(*), coalesce(sum(hashtext(parent_id::text || child_id::text)::bigint), 0)
+  FROM ingredient_hierarchy
+"""
+
+_EMPTY: FrozenSet[str] = frozenset()
+
+
+class Closure:
+    """
+    Transitive closure of ingredient_hierarchy (parent -> child edges), with
+    ancestors and descendants precomputed per canonical id for O(1) lookups.
+    """
+
+    def __init__(self, edges: Iterable[Tuple[str, str]], names: Optional[Dict[str, str]] = None,
+                 version: Optional[Tuple[int, int]] = None):
+        parents: Dict[str, Set[str]] = defaultdict(set)
+        for parent_id, child_id in edges:
+            if parent_id != child_id:
+                parents[child_id].add(parent_id)
+
+        ancestors = {node: self._collect_ancestors(node, parents) for node in list(parents)}
+
+        descendants: Dict[str, Set[str]] = defaultdict(set)
+        for node, ups in ancestors.items():
+            for up in ups:
+                descendants[up].add(node)
+
+        self.ancestors = ancestors
+        self.descendants = {k: frozenset(v) for k, v in descendants.items()}
+        self.names = names or {}
+        # Fingerprint of ingredient_hierarchy this closure was built from
+        self.version = version
+
+    @staticmethod
+    def _collect_ancestors(node: str, parents: Dict[str, Set[str]]) -> FrozenSet[str]:
+        # Iterative DFS over parent edges: no recursion limit on deep chains, and
+        # on a cycle every member gets the same, complete ancestor set
+        seen: Set[str] = set()
+        stack = list(parents.get(node, ()))
+        while stack:
+            parent = stack.pop()
+            if parent in seen:
+                continue
+            seen.add(parent)
+            stack.extend(parents.get(parent, ()))
+        seen.discard(node)
+        return frozenset(seen)
+
+    def ancestors_of(self, canonical_id: str) -> FrozenSet[str]:
+        return self.ancestors.get(canonical_id, _EMPTY)
+
+    def descendants_of(self, canonical_id: str) -> FrozenSet[str]:
+        return self.descendants.get(canonical_id, _EMPTY)
+
+    def expand(self, canonical_ids: Iterable[str]) -> List[str]:
+        """Ids plus every ancestor and descendant (used for exclusion)."""
+        out: Set[str] = set()
+        for cid in canonical_ids:
+            out.add(cid)
+            out |= self.ancestors.get(cid, _EMPTY)
+            out |= self.descendants.get(cid, _EMPTY)
+        return sorted(out)
+
+
+_CLOSURE: Optional[Closure] = None
+_FINGERPRINT: Optional[Tuple[int, int]] = None
+_CHECKED_AT = 0.0
+_LOCK = threading.Lock()
+
+
+def _load() -> Tuple[Closure, Tuple[int, int]]:
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(FINGERPRINT_SQL)
+            count, checksum = cur.fetchone()
+            cur.execute(EDGES_SQL)
+            rows = cur.fetchall()
+
+    names = {}
+    for parent_id, child_id, parent_name, child_name in rows:
+        names[parent_id] = parent_name
+        names[child_id] = child_name
+    fingerprint = (int(count), int(checksum))
+    return Closure(((r[0], r[1]) for r in rows), names, fingerprint), fingerprint
+
+
+def get_closure() -> Closure:
+    global _CLOSURE, _FINGERPRINT, _CHECKED_AT
+
+    now = time.monotonic()
+    if _CLOSURE is not None and now - _CHECKED_AT < HIERARCHY_TTL_S:
+        return _CLOSURE
+
+    with _LOCK:
+        if _CLOSURE is not None and now - _CHECKED_AT < HIERARCHY_TTL_S:
+            return _CLOSURE
+
+        if _CLOSURE is not None:
+            with get_conn() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(FINGERPRINT_SQL)
+                    count, checksum = cur.fetchone()
+            if (int(count), int(checksum)) == _FINGERPRINT:
+                _CHECKED_AT = now
+                return _CLOSURE
+
+        _CLOSURE, _FINGERPRINT = _load()
+        _CHECKED_AT = now
+        return _CLOSURE
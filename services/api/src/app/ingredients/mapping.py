@@ -0,0 +1,50 @@
+from typing import Iterable, Tuple
+
+from app.db import get_conn
+from app.observability import incr
+
+# Confidence recorded per match type (ingredient_item_canonical_map.match_confidence)
+MATCH_CONFIDENCE = {"exact": 100, "contains": 80, "regex": 60}
+
+UPSERT_SQL = """
+  INSERT INTO ingredient_item_canonical_map
+    (ingredient_item_id, canonical_id, match_confidence, matched_by, rules_version)
+  VALUES (%s::uuid, %s::uuid, %s, %s, %s)
+  ON CONFLICT (ingredient_item_id) DO UPDATE
+  SET canonical_id = EXCLUDED.canonical_id,
+      match_confidence = EXCLUDED.match_confidence,
+      matched_by = EXCLUDED.matched_by,
+      rules_version = EXCLUDED.rules_version,
+      created_at = now()
+"""
+
+# (item_id, canonical_id, matched_by, rules_version)
+Mapping = Tuple[str, str, str, str]
+
+
+def map_row(item_id: str, canonical_id: str, matched_by: str, rules_version: str) -> tuple:
+    return (item_id, canonical_id, MATCH_CONFIDENCE.get(matched_by, 50), matched_by, rules_version)
+
+
+def write_mappings(conn, mappings: Iterable[Mapping]) -> int:
+    rows = [map_row(*m) for m in mappings]
+    if rows:
+        with conn.cursor() as cur:
+            cur.executemany(UPSERT_SQL, rows)
+    return len(rows)
+
+
+def record_mappings(mappings: Iterable[Mapping]) -> None:
+    """
+    Persist live resolutions before the handler returns. A background writer
+    would be frozen with the container between invocations (possibly mid
+    transaction) and lose its queue when the container is reaped. Best effort:
+    a failed write is counted, not raised; those items are simply resolved again
+    next time.
+    """
+    try:
+        with get_conn() as conn:
+            written = write_mappings(conn, mappings)
+        incr("canonical_map.written", written)
+    except Exception:
+        incr("canonical_map.write_errors")
@@ -1,19 +1,174 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
 from dataclasses import dataclass
-from typing import List, Optional, Tuple
-from functools import lru_cache
+from typing import Dict, List, Optional, Pattern, Tuple, Union
 from app.db import get_conn
 
+# How often (at most) a warm container checks the synonym tables for changes
+RULES_TTL_S = float(os.getenv("RULES_TTL_S", "60"))
+# Prebuilt rules shipped in the bundle (scripts/build_rules_snapshot.py); optional
+RULES_SNAPSHOT_PATH = os.getenv(
+    "RULES_SNAPSHOT_PATH", os.path.join(os.path.dirname(__file__), "rules_snapshot.json")
+)
+
 @dataclass(frozen=True)
 class SynRule:
     canonical_id: str
     canonical_name: str
     synonym: str
-    match_type: str  # 'exact' | 'contains'
+    match_type: str  # 'exact' | 'contains' | 'regex'
 
 def norm(s: str) -> str:
     return " ".join(s.strip().lower().split())
 
-@lru_cache
+
+class CompiledRules:
+    """
+    Matcher built once from a rule list (as ordered by load_rules()).
+
+    Priority is the same as the old linear scan: any exact match first, then the
+    first matching 'contains' synonym in list order (longest, since load_rules()
+    sorts by length), then 'regex' rules in list order. Regexes are searched
+    case-insensitively in the normalized text; invalid patterns are skipped.
+
+    `version` is a hash of the rule set; cached resolutions made under a
+    different version must not be trusted.
+
+    Passing the `previous` matcher makes a rebuild incremental: the 'contains'
+    automaton is reused when those synonyms did not change, and regexes that
+    were already compiled are not compiled again.
+    """
+
+    def __init__(self, rules: List[SynRule], previous: Optional["CompiledRules"] = None):
+        self.rules = rules
+        self.version = rules_version(rules)
+        self.names: Dict[str, str] = {r.canonical_id: r.canonical_name for r in rules}
+        self._exact: Dict[str, Tuple[str, str]] = {}
+        self._regex: List[Tuple[Pattern[str], Tuple[str, str]]] = []
+
+        # Aho-Corasick automaton over 'contains' synonyms. Node 0 is the root.
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Lowest rule index ending at each node, following fail links
+        self._best: List[Optional[int]] = [None]
+        self._results: List[Tuple[str, str]] = []
+
+        contains: List[Tuple[str, Tuple[str, str]]] = []
+        compiled = previous._compiled if previous is not None else {}
+        self._compiled: Dict[str, Optional[Pattern[str]]] = {}
+
+        for rule in rules:
+            result = (rule.canonical_id, rule.canonical_name)
+            if rule.match_type == "exact":
+                self._exact.setdefault(norm(rule.synonym), result)
+            elif rule.match_type == "contains":
+                contains.append((norm(rule.synonym), result))
+            elif rule.match_type == "regex":
+                if rule.synonym in compiled:
+                    pattern = compiled[rule.synonym]
+                else:
+                    try:
+                        pattern = re.compile(rule.synonym, re.IGNORECASE)
+                    except re.error:
+                        pattern = None
+                self._compiled[rule.synonym] = pattern
+                if pattern is not None:
+                    self._regex.append((pattern, result))
+
+        self._contains = contains
+        if previous is not None and previous._contains == contains:
+            self._goto, self._fail = previous._goto, previous._fail
+            self._best, self._results = previous._best, previous._results
+            return
+
+        for syn, result in contains:
+            self._add_contains(syn, result)
+        self._build_fail_links()
+
+    def _add_contains(self, syn: str, result: Tuple[str, str]) -> None:
+        node = 0
+        for ch in syn:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._best.append(None)
+            node = nxt
+
+        # Rules arrive longest-first, so the lowest index is the longest synonym
+        key = len(self._results)
+        self._results.append(result)
+        if self._best[node] is None:
+            self._best[node] = key
+
+    def _build_fail_links(self) -> None:
+        goto, fail, best = self._goto, self._fail, self._best
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            inherited = best[fail[node]]
+            if inherited is not None and (best[node] is None or inherited < best[node]):
+                best[node] = inherited
+            for ch, child in goto[node].items():
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[child] = goto[f].get(ch, 0)
+                queue.append(child)
+
+    def _match_contains(self, t: str) -> Optional[Tuple[str, str]]:
+        goto, fail, best = self._goto, self._fail, self._best
+        found = best[0]
+        node = 0
+        for ch in t:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            candidate = best[node]
+            if candidate is not None and (found is None or candidate < found):
+                found = candidate
+        return self._results[found] if found is not None else None
+
+    def match(self, raw_text: str) -> Optional[Tuple[str, str, str]]:
+        """Like resolve(), plus the match type that decided it."""
+        t = norm(raw_text)
+        if not t:
+            return None
+
+        hit = self._exact.get(t)
+        if hit:
+            return hit + ("exact",)
+
+        hit = self._match_contains(t)
+        if hit:
+            return hit + ("contains",)
+
+        for pattern, result in self._regex:
+            if pattern.search(t):
+                return result + ("regex",)
+
+        return None
+
+    def resolve(self, raw_text: str) -> Optional[Tuple[str, str]]:
+        hit = self.match(raw_text)
+        return hit[:2] if hit else None
+
+
+def rules_version(rules: List[SynRule]) -> str:
+    h = hashlib.sha256()
+    for r in rules:
+        h.update("\x1f".join((r.canonical_id, r.canonical_name, r.synonym, r.match_type)).encode())
+        h.update(b"\x1e")
+    return h.hexdigest()[:16]
+
+
 def load_rules() -> List[SynRule]:
     sql = """
       WITH rules AS (
@@ -51,16 +206,99 @@ def load_rules() -> List[SynRule]:
 
     return [SynRule(r[0], r[1], r[2], r[3]) for r in rows]
 
-def resolve_to_canonical(raw_text: str, rules: List[SynRule]) -> Optional[Tuple[str, str]]:
-    t = norm(raw_text)
-    if not t:
+
+# Cheap change detector over everything load_rules() reads. The tables have no
+# updated_at, so renames and is_active flips are caught by the hash sum.
+RULES_FINGERPRINT_SQL = """
+  SELECT
+    (SELECT count(*) FROM ingredient_canonical) + (SELECT count(*) FROM ingredient_synonyms),
+    coalesce((SELECT sum(hashtext(id::text || name)::bigint) FROM ingredient_canonical), 0)
+    + coalesce((
+        SELECT sum(hashtext(id::text || canonical_id::text || synonym || match_type::text
+                            || is_active::text)::bigint)
+        FROM ingredient_synonyms
+      ), 0)
+"""
+
+
+def _fetch_fingerprint() -> Tuple[int, int]:
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(RULES_FINGERPRINT_SQL)
+            count, checksum = cur.fetchone()
+    return int(count), int(checksum)
+
+
+def write_rules_snapshot(path: str) -> Dict[str, object]:
+    """Serialize the current rules (plus their fingerprint) for bundling."""
+    fingerprint = _fetch_fingerprint()
+    rules = load_rules()
+    doc = {
+        "fingerprint": list(fingerprint),
+        "rules": [[r.canonical_id, r.canonical_name, r.synonym, r.match_type] for r in rules],
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(doc, f, ensure_ascii=False, separators=(",", ":"))
+    return {"path": path, "rules": len(rules), "version": rules_version(rules)}
+
+
+def _read_snapshot(path: str) -> Optional[Tuple[List[SynRule], Tuple[int, int]]]:
+    try:
+        with open(path, "rb") as f:
+            doc = json.load(f)
+        count, checksum = doc["fingerprint"]
+        return [SynRule(*r) for r in doc["rules"]], (int(count), int(checksum))
+    except (OSError, ValueError, KeyError, TypeError):
         return None
 
-    for rule in rules:
-        syn = norm(rule.synonym)
-        if rule.match_type == "exact" and t == syn:
-            return (rule.canonical_id, rule.canonical_name)
-        if rule.match_type == "contains" and syn in t:
-            return (rule.canonical_id, rule.canonical_name)
 
-    return None
+_RULES: Optional[CompiledRules] = None
+_FINGERPRINT: Optional[Tuple[int, int]] = None
+_CHECKED_AT = 0.0
+_LOCK = threading.Lock()
+
+
+def load_compiled_rules() -> CompiledRules:
+    """
+    Compiled rules, revalidated against the database at most every RULES_TTL_S.
+
+    A cold container starts from the bundled snapshot when there is one, so the
+    first request needs no rules query; the snapshot is checked like any other
+    cached copy once the TTL has passed.
+    """
+    global _RULES, _FINGERPRINT, _CHECKED_AT
+
+    now = time.monotonic()
+    if _RULES is not None and now - _CHECKED_AT < RULES_TTL_S:
+        return _RULES
+
+    with _LOCK:
+        if _RULES is not None and now - _CHECKED_AT < RULES_TTL_S:
+            return _RULES
+
+        if _RULES is None:
+            snapshot = _read_snapshot(RULES_SNAPSHOT_PATH)
+            if snapshot is not None:
+                rules, _FINGERPRINT = snapshot
+                _RULES = CompiledRules(rules)
+                _CHECKED_AT = now
+                return _RULES
+
+        fingerprint = _fetch_fingerprint()
+        if _RULES is not None and fingerprint == _FINGERPRINT:
+            _CHECKED_AT = now
+            return _RULES
+
+        rules = load_rules()
+        if _RULES is None or rules_version(rules) != _RULES.version:
+            _RULES = CompiledRules(rules, previous=_RULES)
+        _FINGERPRINT = fingerprint
+        _CHECKED_AT = now
+        return _RULES
+
+
+def resolve_to_canonical(raw_text: str,
+                         rules: Union[CompiledRules, List[SynRule]]) -> Optional[Tuple[str, str]]:
+    if not isinstance(rules, CompiledRules):
+        rules = CompiledRules(rules)
+    return rules.resolve(raw_text)
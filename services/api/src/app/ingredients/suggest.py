@@ -0,0 +1,117 @@
+import bisect
+import heapq
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.db import get_conn
+from app.ingredients.resolve import CompiledRules, load_compiled_rules, norm
+
+SUGGEST_MAX_LIMIT = 25
+# How often (at most) product frequencies are re-read; rule changes rebuild sooner
+SUGGEST_TTL_S = float(os.getenv("SUGGEST_TTL_S", "600"))
+
+# Active products per canonical ingredient (products.canonical_ids, migration 004)
+FREQUENCY_SQL = """
+  SELECT cid::text, count(*)
+  FROM products p, unnest(p.canonical_ids) AS cid
+  WHERE p.is_active
+  GROUP BY cid
+"""
+
+
+class SuggestIndex:
+    """
+    Sorted array of normalized canonical names and exact/contains synonyms, with
+    an extra entry per later word ("chicken meal" is also found by "meal").
+    A prefix is a bisect plus a scan of the matching slice.
+    """
+
+    def __init__(self, rules: CompiledRules, frequency: Dict[str, int]):
+        entries: List[Tuple[str, str, str]] = []
+        for rule in rules.rules:
+            if rule.match_type == "regex":
+                continue
+            term = norm(rule.synonym)
+            words = term.split(" ")
+            for i in range(len(words)):
+                entries.append((" ".join(words[i:]), rule.canonical_id, rule.synonym))
+        entries.sort()
+
+        self.terms = [e[0] for e in entries]
+        self.entries = entries
+        self.names = rules.names
+        self.frequency = frequency
+        self.rules_version = rules.version
+
+    def suggest(self, q: str, limit: int = 10) -> List[Dict[str, Any]]:
+        q = norm(q)
+        if not q:
+            return []
+
+        # canonical_id -> (exact term match, matched text)
+        found: Dict[str, Tuple[bool, str]] = {}
+        i = bisect.bisect_left(self.terms, q)
+        terms, entries = self.terms, self.entries
+        while i < len(terms) and terms[i].startswith(q):
+            _, canonical_id, synonym = entries[i]
+            exact = terms[i] == q
+            if canonical_id not in found or (exact and not found[canonical_id][0]):
+                found[canonical_id] = (exact, synonym)
+            i += 1
+
+        freq, names = self.frequency, self.names
+        ranked = heapq.nsmallest(
+            limit, found.items(),
+            key=lambda x: (not x[1][0], -freq.get(x[0], 0), names.get(x[0], "").lower()),
+        )
+        return [
+            {
+                "id": canonical_id,
+                "name": names.get(canonical_id, matched),
+                "matched": matched,
+                "product_count": freq.get(canonical_id, 0),
+            }
+            for canonical_id, (_, matched) in ranked
+        ]
+
+
+def _load_frequency() -> Dict[str, int]:
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(FREQUENCY_SQL)
+            return {cid: int(n) for cid, n in cur.fetchall()}
+
+
+_INDEX: Optional[SuggestIndex] = None
+_BUILT_AT = 0.0
+_LOCK = threading.Lock()
+
+
+def get_suggest_index() -> SuggestIndex:
+    """
+    Built per container from the cached compiled rules plus one frequency query.
+    Between rebuilds, suggestions need no database round trip.
+    """
+    global _INDEX, _BUILT_AT
+
+    rules = load_compiled_rules()
+    now = time.monotonic()
+    index = _INDEX
+    fresh = index is not None and now - _BUILT_AT < SUGGEST_TTL_S
+    if fresh and index.rules_version == rules.version:
+        return index
+
+    with _LOCK:
+        index = _INDEX
+        fresh = index is not None and now - _BUILT_AT < SUGGEST_TTL_S
+        if fresh and index.rules_version == rules.version:
+            return index
+        if fresh:
+            # Only the rules changed; keep the frequencies we already have
+            _INDEX = SuggestIndex(rules, index.frequency)
+        else:
+            _INDEX = SuggestIndex(rules, _load_frequency())
+            _BUILT_AT = now
+        return _INDEX
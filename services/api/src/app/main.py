@@ -1,33 +1,575 @@
-import json
+import hmac
 import os
+import time
+from datetime import datetime
 from typing import Any, Dict, Optional
 
+from app.cache import RESPONSE_CACHE
+from app.compare.cache import COMPARE_CACHE
 from app.errors import error_response
-from app.observability import get_request_id, log_json, elapsed_ms
+from app.http_cache import cache_headers, content_etag, if_none_match, make_etag
+from app.observability import get_request_id, get_counters, incr, log_json, elapsed_ms
+from app.router import Request, Router
+from app.serialization import dumps
 from app.symptoms import SYMPTOMS
 
 
 SERVICE_NAME = os.getenv("SERVICE_NAME", "api")
 ENV = os.getenv("ENV", "prod")
-
-
-def _ok(body: Any, request_id: str, status_code: int = 200) -> Dict[str, Any]:
+# Optional prefix in front of every route (e.g. a stage name in HTTP API rawPath)
+API_BASE_PATH = os.getenv("API_BASE_PATH", "")
+
+# Applied in order by /admin/migrate, each once (recorded in schema_migrations).
+# Keep them idempotent and free of data backfills; derived columns are filled in
+# by the chunked steps in app.ingredients.backfill.
+MIGRATIONS = (
+    "001_add_canonical_id.sql",
+    "002_backfill_jobs.sql",
+    "003_latest_ingredient_list.sql",
+    "004_product_canonical_ids.sql",
+    "005_catalog_keyset_index.sql",
+    "006_catalog_version.sql",
+    "007_item_canonical_map_rules_version.sql",
+    "008_product_search.sql",
+    "009_canonical_ids_version.sql",
+    "010_unmapped_items_index.sql",
+)
+
+# Per-route TTLs for RESPONSE_CACHE (0 disables caching for that route)
+CACHE_TTL_S = {
+    "catalog_products": float(os.getenv("CACHE_TTL_PRODUCTS_S", "60")),
+    "catalog_product": float(os.getenv("CACHE_TTL_PRODUCT_S", "300")),
+    "catalog_similar": float(os.getenv("CACHE_TTL_SIMILAR_S", "300")),
+}
+
+# Static, so serialize once per container
+_SYMPTOMS_BODY = dumps({"items": [{"code": c, "label": l} for c, l in SYMPTOMS]})
+_SYMPTOMS_ETAG = content_etag(_SYMPTOMS_BODY)
+
+
+def _ok(body: Any, request_id: str, status_code: int = 200,
+        extra_headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    return _ok_json_text(dumps(body), request_id, status_code, extra_headers)
+
+
+def _ok_json_text(body: str, request_id: str, status_code: int = 200,
+                  extra_headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    # Body already serialized (e.g. built by Postgres); pass it through as-is
     return {
         "statusCode": status_code,
         "headers": {
             "content-type": "application/json",
             "x-request-id": request_id,
+            **(extra_headers or {}),
+        },
+        "body": body,
+    }
+
+
+def _not_modified(request_id: str, route: str, etag: str) -> Dict[str, Any]:
+    return {
+        "statusCode": 304,
+        "headers": {
+            "x-request-id": request_id,
+            **cache_headers(route, etag),
         },
-        "body": json.dumps(body, ensure_ascii=False),
+        "body": "",
+    }
+
+
+def _truthy(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes")
+    return bool(value)
+
+
+def _compare_payload_from_query(query: Dict[str, str]) -> Dict[str, Any]:
+    tokens = [t for t in (query.get("product_tokens") or "").split(",") if t]
+    return {
+        "product_tokens": tokens,
+        "mode": query.get("mode") or "raw",
+        "include_trace": _truthy(query.get("include_trace")),
+        "include_may_contain": _truthy(query.get("include_may_contain")),
     }
 
 
 def _parse_event(event: Dict[str, Any]) -> Dict[str, Any]:
     # REST API Gateway (proxy) shape
-    method = event.get("httpMethod") or event.get("requestContext", {}).get("http", {}).get("method")
+    method = (event.get("httpMethod")
+              or event.get("requestContext", {}).get("http", {}).get("method"))
     path = event.get("path") or event.get("rawPath")
     headers = event.get("headers") or {}
-    return {"method": method, "path": path, "headers": headers}
+    query = event.get("queryStringParameters") or {}
+    return {"method": method, "path": path, "headers": headers, "query": query}
+
+
+def _bad_request(message: str, request_id: str) -> Dict[str, Any]:
+    return error_response(
+        code="BAD_REQUEST",
+        message=message,
+        request_id=request_id,
+        status_code=400,
+    )
+
+
+def _product_not_found(request_id: str) -> Dict[str, Any]:
+    return error_response(
+        code="NOT_FOUND",
+        message="Product not found.",
+        request_id=request_id,
+        status_code=404,
+        details=[{"field": "product", "issue": "No product for given id/slug"}],
+    )
+
+
+def _is_admin(req: Request) -> bool:
+    # Fails closed: with ADMIN_KEY unset nobody is an admin
+    expected = os.environ.get("ADMIN_KEY")
+    supplied = req.headers.get("x-admin-key")
+    if not expected or not supplied:
+        return False
+    return hmac.compare_digest(supplied.encode(), expected.encode())
+
+
+def _forbidden(request_id: str) -> Dict[str, Any]:
+    return error_response(
+        code="FORBIDDEN",
+        message="Not authorized.",
+        request_id=request_id,
+        status_code=403,
+    )
+
+
+# ---------- Routes ----------
+# Handlers take a Request and return an API Gateway response. A ValueError from
+# a handler becomes a 400.
+ROUTER = Router(API_BASE_PATH)
+
+
+@ROUTER.route("GET", pattern="/health")
+def _health(req: Request) -> Dict[str, Any]:
+    return _ok(
+        {"status": "ok", "env": ENV, "time": datetime.utcnow().isoformat() + "Z"},
+        req.request_id,
+        extra_headers=cache_headers("health", None),
+    )
+
+
+@ROUTER.route("GET", pattern="/meta/symptoms", name="meta_symptoms")
+def _meta_symptoms(req: Request) -> Dict[str, Any]:
+    if if_none_match(req.headers, _SYMPTOMS_ETAG):
+        return _not_modified(req.request_id, "meta_symptoms", _SYMPTOMS_ETAG)
+    return _ok_json_text(
+        _SYMPTOMS_BODY,
+        req.request_id,
+        extra_headers=cache_headers("meta_symptoms", _SYMPTOMS_ETAG),
+    )
+
+
+@ROUTER.route("GET", pattern="/db/ping", name="db_ping")
+def _db_ping(req: Request) -> Dict[str, Any]:
+    try:
+        from app.db import get_conn
+        with get_conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+                val = cur.fetchone()[0]
+        return _ok({"ok": True, "value": val, "pool": get_counters("db_pool.")}, req.request_id)
+    except Exception as e:
+        return error_response(
+            code="DB_UNAVAILABLE",
+            message="Database connectivity check failed.",
+            request_id=req.request_id,
+            status_code=503,
+            details=[{"field": "db", "issue": str(e)}],
+        )
+
+
+@ROUTER.route("GET", pattern="/catalog/products", name="catalog_products")
+def _catalog_products(req: Request) -> Dict[str, Any]:
+    from app.catalog.cursor import page_size
+    from app.catalog.repo import list_products
+    from app.catalog.version import get_catalog_version
+
+    limit = page_size(req.query.get("limit"), 20)
+    cursor = req.query.get("cursor")
+
+    def _build_list() -> str:
+        items, next_cursor = list_products(limit=limit, cursor=cursor)
+        return dumps({"items": items, "next_cursor": next_cursor})
+
+    version = get_catalog_version()
+    etag = make_etag(version, "catalog_products", [limit, cursor])
+    if if_none_match(req.headers, etag):
+        return _not_modified(req.request_id, "catalog_products", etag)
+    body = RESPONSE_CACHE.get_or_build(
+        ("catalog_products", limit, cursor),
+        version,
+        CACHE_TTL_S["catalog_products"],
+        _build_list,
+    )
+    return _ok_json_text(
+        body, req.request_id, extra_headers=cache_headers("catalog_products", etag),
+    )
+
+
+@ROUTER.route("GET", pattern="/catalog/products/{token}", name="catalog_product")
+def _catalog_product(req: Request) -> Dict[str, Any]:
+    from app.catalog import product_detail
+    from app.catalog.version import get_catalog_version
+
+    token = req.params["token"]
+
+    def _build_product() -> Optional[str]:
+        if product_detail.DETAIL_MODE == "json_agg":
+            return product_detail.get_product_json_by_id_or_slug(token)
+        found = product_detail.get_product_by_id_or_slug(token)
+        return dumps(found) if found else None
+
+    version = get_catalog_version()
+    etag = make_etag(version, "catalog_product", [token, product_detail.DETAIL_MODE])
+    if if_none_match(req.headers, etag, match_any=False):
+        return _not_modified(req.request_id, "catalog_product", etag)
+    # Not-found results are not cached. "If-None-Match: *" is only honoured once the
+    # product is known to exist, so an unknown token still gets its 404.
+    product = RESPONSE_CACHE.get_or_build(
+        ("catalog_product", token),
+        version,
+        CACHE_TTL_S["catalog_product"],
+        _build_product,
+    )
+    if not product:
+        return _product_not_found(req.request_id)
+    if if_none_match(req.headers, etag):
+        return _not_modified(req.request_id, "catalog_product", etag)
+    return _ok_json_text(
+        product, req.request_id, extra_headers=cache_headers("catalog_product", etag),
+    )
+
+
+@ROUTER.route("GET", pattern="/catalog/products/{token}/similar", name="catalog_similar")
+def _catalog_similar(req: Request) -> Dict[str, Any]:
+    from app.catalog.similar import SIMILAR_MAX_K, find_similar
+    from app.catalog.version import get_catalog_version
+
+    token = req.params["token"]
+    try:
+        k = int(req.query.get("k") or 10)
+    except (TypeError, ValueError):
+        raise ValueError("k must be an integer")
+    k = max(1, min(k, SIMILAR_MAX_K))
+
+    def _build_similar() -> Optional[str]:
+        found = find_similar(token, k)
+        return dumps(found) if found else None
+
+    version = get_catalog_version()
+    etag = make_etag(version, "catalog_similar", [token, k])
+    if if_none_match(req.headers, etag, match_any=False):
+        return _not_modified(req.request_id, "catalog_similar", etag)
+    body = RESPONSE_CACHE.get_or_build(
+        ("catalog_similar", token, k),
+        version,
+        CACHE_TTL_S["catalog_similar"],
+        _build_similar,
+    )
+    if not body:
+        return _product_not_found(req.request_id)
+    if if_none_match(req.headers, etag):
+        return _not_modified(req.request_id, "catalog_similar", etag)
+    return _ok_json_text(body, req.request_id, extra_headers=cache_headers("catalog_similar", etag))
+
+
+@ROUTER.route("POST", pattern="/catalog/products:batchGet", name="catalog_batch_get")
+def _catalog_batch_get(req: Request) -> Dict[str, Any]:
+    from app.catalog.product_detail import BATCH_GET_MAX, get_products_by_ids_or_slugs
+
+    tokens = req.json().get("product_tokens")
+    if (
+        not isinstance(tokens, list)
+        or not tokens
+        or not all(isinstance(t, str) and t for t in tokens)
+    ):
+        raise ValueError("product_tokens must be a non-empty list of ids or slugs")
+    if len(tokens) > BATCH_GET_MAX:
+        raise ValueError(f"product_tokens accepts at most {BATCH_GET_MAX} items")
+
+    return _ok({"items": get_products_by_ids_or_slugs(tokens)}, req.request_id)
+
+
+@ROUTER.route("GET", "POST", pattern="/compare")
+def _compare(req: Request) -> Dict[str, Any]:
+    if req.method == "GET":
+        # Cacheable form for CloudFront/browsers:
+        # ?product_tokens=a,b&mode=canonical&include_trace=1
+        payload = _compare_payload_from_query(req.query)
+    else:
+        payload = req.json()
+
+    from app.compare.service import compare_products
+
+    # Only GET responses carry an ETag; POST skips the catalog_version lookup
+    etag = None
+    if req.method == "GET":
+        from app.catalog.version import get_catalog_version
+
+        etag = make_etag(get_catalog_version(), "compare", {
+            "product_tokens": payload.get("product_tokens"),
+            "mode": payload.get("mode") or "raw",
+            "include_trace": bool(payload.get("include_trace", False)),
+            "include_may_contain": bool(payload.get("include_may_contain", False)),
+        })
+        # "*" is left to the compare itself: unknown tokens must still fail
+        if if_none_match(req.headers, etag, match_any=False):
+            return _not_modified(req.request_id, "compare", etag)
+
+    out = compare_products(payload)
+    # Read by scripts/build_compare_prewarm.py
+    log_json(
+        "INFO", SERVICE_NAME, ENV, req.request_id, "compare",
+        product_ids=[p["id"] for p in out["products"]],
+        mode=out["notes"]["mode"],
+        include_trace=out["notes"]["trace_included"],
+        include_may_contain=out["notes"]["may_contain_included"],
+    )
+    return _ok(
+        out, req.request_id,
+        extra_headers=cache_headers("compare", etag) if req.method == "GET" else None,
+    )
+
+
+@ROUTER.route("GET", pattern="/ingredients/suggest", name="ingredients_suggest")
+def _ingredients_suggest(req: Request) -> Dict[str, Any]:
+    from app.ingredients.suggest import SUGGEST_MAX_LIMIT, get_suggest_index
+
+    try:
+        limit = int(req.query.get("limit") or 10)
+    except (TypeError, ValueError):
+        raise ValueError("limit must be an integer")
+    limit = max(1, min(limit, SUGGEST_MAX_LIMIT))
+
+    items = get_suggest_index().suggest(req.query.get("q") or "", limit)
+    return _ok(
+        {"items": items}, req.request_id,
+        extra_headers=cache_headers("ingredients_suggest", None),
+    )
+
+
+@ROUTER.route("POST", pattern="/catalog/search", name="catalog_search")
+def _catalog_search(req: Request) -> Dict[str, Any]:
+    from app.catalog.cursor import page_size
+    from app.catalog.search import search_products
+
+    payload = req.json()
+    species = payload.get("species")
+    format_ = payload.get("format")
+    life_stage = payload.get("life_stage")
+    exclude_ids = payload.get("exclude_canonical_ids") or []
+    limit = page_size(payload.get("limit"), 25)
+
+    if not isinstance(exclude_ids, list):
+        raise ValueError("exclude_canonical_ids must be a list")
+    q = payload.get("q")
+    if q is not None and not isinstance(q, str):
+        raise ValueError("q must be a string")
+
+    items, next_cursor = search_products(
+        species, format_, life_stage, exclude_ids,
+        limit=limit, cursor=payload.get("cursor"), q=q,
+    )
+    return _ok({"items": items, "next_cursor": next_cursor}, req.request_id)
+
+
+@ROUTER.route("POST", pattern="/catalog/export", name="catalog_export")
+def _catalog_export(req: Request) -> Dict[str, Any]:
+    if not _is_admin(req):
+        return _forbidden(req.request_id)
+
+    # The destination comes from configuration (EXPORT_BUCKET), never from the
+    # caller; the body may only carry a continuation_token. Run by a scheduled
+    # job until done; consumers read EXPORT_PREFIX/latest.json from the bucket.
+    from app.catalog.export import ExportNotConfigured, export_catalog_part
+    start_export = time.perf_counter()
+    try:
+        out = export_catalog_part(
+            req.json().get("continuation_token"),
+            time_left_ms=getattr(req.context, "get_remaining_time_in_millis", None),
+        )
+    except ExportNotConfigured as e:
+        return error_response(
+            code="EXPORT_NOT_CONFIGURED",
+            message=str(e),
+            request_id=req.request_id,
+            status_code=503,
+        )
+    return _ok({"ok": True, **out, "elapsed_ms": elapsed_ms(start_export)}, req.request_id)
+
+
+@ROUTER.route("POST", pattern="/admin/migrate", name="admin_migrate")
+def _admin_migrate(req: Request) -> Dict[str, Any]:
+    try:
+        if not _is_admin(req):
+            return _forbidden(req.request_id)
+
+        from app.admin_db import apply_migrations
+        from app.ingredients.backfill import (
+            JOB_KIND, JOB_STEPS, RECANONICALIZE_KIND, chunk_size_from, run_job, start_job,
+        )
+
+        payload = req.json()
+        token = payload.get("continuation_token")
+        chunk_size = chunk_size_from(payload.get("chunk_size"))
+        time_left_ms = getattr(req.context, "get_remaining_time_in_millis", None)
+
+        # 1) Apply migration files not yet recorded in schema_migrations, one
+        # transaction each. Only when starting a new job; a run cut short by the
+        # deadline reports what is left, and the next call without a token resumes.
+        if not token:
+            applied, pending = apply_migrations(MIGRATIONS, time_left_ms=time_left_ms)
+            if pending:
+                return _ok({
+                    "ok": True,
+                    "done": False,
+                    "applied_migrations": applied,
+                    "pending_migrations": pending,
+                    "continuation_token": None,
+                }, req.request_id)
+            # after_id resumes the item backfill directly, skipping the product sweeps.
+            # recanonicalize (after a synonym rules change) also re-resolves items
+            # mapped under older rules and overwrites their canonical_id.
+            after_id = payload.get("after_id")
+            if _truthy(payload.get("recanonicalize")):
+                token = start_job(RECANONICALIZE_KIND, after_id)
+            elif after_id:
+                token = start_job(JOB_KIND, after_id)
+            else:
+                token = start_job(JOB_STEPS[0])
+
+        # 2) Derived-column sweeps, then the canonical_id backfill, in chunks within
+        # this invocation's time budget. An unfinished run returns a
+        # continuation_token to resume from.
+        def _log_chunk(progress):
+            log_json(
+                "INFO",
+                SERVICE_NAME,
+                ENV,
+                req.request_id,
+                "backfill_chunk",
+                **progress.as_dict(),
+            )
+
+        result = run_job(token, chunk_size, on_chunk=_log_chunk, time_left_ms=time_left_ms)
+        return _ok({"ok": True, **result.as_dict()}, req.request_id)
+
+    except ValueError as ve:
+        return _bad_request(str(ve), req.request_id)
+    except Exception as e:
+        return error_response(
+            code="MIGRATION_FAILED",
+            message=str(e),
+            request_id=req.request_id,
+            status_code=500,
+        )
+
+
+@ROUTER.route("POST", pattern="/admin/similar-index", name="admin_similar_index")
+def _admin_similar_index(req: Request) -> Dict[str, Any]:
+    if not _is_admin(req):
+        return _forbidden(req.request_id)
+
+    from app.catalog.similar import refresh_index
+
+    # Rebuilds the index of the container serving this request only, if
+    # canonical_ids changed since it was built. Other warm containers keep theirs
+    # until they are recycled or hit by this route themselves; the fleet-wide way
+    # to refresh is shipping a new artifact (scripts/build_similar_index.py).
+    start_refresh = time.perf_counter()
+    index, rebuilt = refresh_index(force=_truthy(req.json().get("force")))
+    return _ok({
+        "ok": True,
+        "rebuilt": rebuilt,
+        "products": len(index.ids),
+        "fingerprint": index.fingerprint,
+        "elapsed_ms": elapsed_ms(start_refresh),
+    }, req.request_id)
+
+
+# Imported by init() when INIT_PRELOAD is set, instead of on each route's first request
+PRELOAD_MODULES = (
+    "app.catalog.cursor",
+    "app.catalog.export",
+    "app.catalog.product_detail",
+    "app.catalog.repo",
+    "app.catalog.search",
+    "app.catalog.similar",
+    "app.catalog.version",
+    "app.compare.service",
+    "app.ingredients.suggest",
+)
+
+_INITIALIZED = False
+
+
+def init(preload: Optional[bool] = None) -> None:
+    """
+    Container init phase, run once from the Lambda handler module before the
+    first invoke. Without preloading it only does what every request needs (the
+    router and static bodies are built at import), so /health never pays for
+    psycopg or boto3. With INIT_PRELOAD=1 (meant for SnapStart, where init is
+    captured in the snapshot) the route modules and DB client libraries are
+    imported up front. With SIMILAR_INDEX_ON_INIT=1 the similar-products index
+    is loaded and, if stale, rebuilt here (requests never build it; a failure is
+    counted and logged, not raised). With COMPARE_PREWARM_ON_INIT=1 the bundled
+    popular compares are computed into COMPARE_CACHE here, within a time budget.
+    Those two are the only cases where init opens a connection (dropped again
+    after restore).
+    """
+    global _INITIALIZED
+    if _INITIALIZED:
+        return
+    _INITIALIZED = True
+    if preload is None:
+        preload = _truthy(os.getenv("INIT_PRELOAD", ""))
+
+    from app import db
+
+    if preload:
+        import importlib
+
+        for name in PRELOAD_MODULES:
+            importlib.import_module(name)
+        db.preload()
+
+    if _truthy(os.getenv("SIMILAR_INDEX_ON_INIT", "")):
+        try:
+            from app.catalog.similar import refresh_index
+
+            refresh_index()
+        except Exception as e:
+            # Database unavailable: lookups use the bundled artifact or the query path
+            incr("similar_index.init_errors")
+            log_json(
+                "ERROR",
+                SERVICE_NAME,
+                ENV,
+                "init",
+                "similar_index_init_failed",
+                error_type=type(e).__name__,
+                error_message=str(e),
+            )
+
+    if _truthy(os.getenv("COMPARE_PREWARM_ON_INIT", "")):
+        from app.compare.cache import prewarm
+        from app.compare.service import compare_products
+
+        prewarm(compare_products)
+
+    try:
+        from snapshot_restore_py import register_after_restore
+    except ImportError:
+        return
+    # Anything credential- or socket-shaped from before the snapshot is stale
+    register_after_restore(db.reset)
 
 
 def handle_request(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
@@ -40,9 +582,10 @@ def handle_request(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         method = str(parsed.get("method") or "").upper()
         path = str(parsed.get("path") or "")
         headers = parsed.get("headers") or {}
+        query = parsed.get("query") or {}
         request_id = get_request_id(headers, getattr(context, "aws_request_id", "unknown"))
 
-        start = __import__("time").perf_counter()
+        start = time.perf_counter()
         log_json(
             "INFO",
             SERVICE_NAME,
@@ -53,158 +596,26 @@ def handle_request(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             path=path,
         )
 
-        # Routes
-        if method == "GET" and path.endswith("/health"):
-            resp = _ok({"status": "ok", "env": ENV, "time": __import__("datetime").datetime.utcnow().isoformat() + "Z"}, request_id)
-
-        elif method == "GET" and path.endswith("/meta/symptoms"):
-            resp = _ok({"items": [{"code": c, "label": l} for c, l in SYMPTOMS]}, request_id)
-
-        elif method == "GET" and path.endswith("/db/ping"):
-            try:
-                from app.db import get_conn
-                with get_conn() as conn:
-                    with conn.cursor() as cur:
-                        cur.execute("SELECT 1;")
-                        val = cur.fetchone()[0]
-                resp = _ok({"ok": True, "value": val}, request_id)
-            except Exception as e:
-                resp = error_response(
-                    code="DB_UNAVAILABLE",
-                    message="Database connectivity check failed.",
-                    request_id=request_id,
-                    status_code=503,
-                    details=[{"field": "db", "issue": str(e)}],
-                )
-
-        elif method == "GET" and path.endswith("/catalog/products"):
-            from app.catalog.repo import list_products
-            items = list_products(limit=20)
-            resp = _ok({"items": items, "next_cursor": None}, request_id)
-
-        elif method == "GET" and path.startswith("/catalog/products/"):
-            token = path.rstrip("/").split("/catalog/products/", 1)[1]
-            if not token:
-                resp = error_response(
-                    code="BAD_REQUEST",
-                    message="Missing product id or slug.",
-                    request_id=request_id,
-                    status_code=400,
-                )
-            else:
-                from app.catalog.product_detail import get_product_by_id_or_slug
-                product = get_product_by_id_or_slug(token)
-                if not product:
-                    resp = error_response(
-                        code="NOT_FOUND",
-                        message="Product not found.",
-                        request_id=request_id,
-                        status_code=404,
-                        details=[{"field": "product", "issue": "No product for given id/slug"}],
-                    )
-                else:
-                    resp = _ok(product, request_id)
-
-        elif method == "POST" and path.endswith("/compare"):
-            try:
-                body = event.get("body") or "{}"
-                payload = json.loads(body) if isinstance(body, str) else body
-                from app.compare.service import compare_products
-                out = compare_products(payload)
-                resp = _ok(out, request_id)
-            except ValueError as ve:
-                resp = error_response(
-                    code="BAD_REQUEST",
-                    message=str(ve),
-                    request_id=request_id,
-                    status_code=400,
-                )
-
-        elif method == "POST" and path.endswith("/catalog/search"):
+        match = ROUTER.match(method, path)
+        route_name = match.route.name if match.route else None
+        if match.route is not None:
+            req = Request(method, path, headers, query, request_id, event, context, match.params)
             try:
-                body = event.get("body") or "{}"
-                payload = json.loads(body) if isinstance(body, str) else body
-
-                species = payload.get("species")
-                format_ = payload.get("format")
-                life_stage = payload.get("life_stage")
-                exclude_ids = payload.get("exclude_canonical_ids") or []
-                limit = int(payload.get("limit") or 25)
-
-                if not isinstance(exclude_ids, list):
-                    raise ValueError("exclude_canonical_ids must be a list")
-
-                from app.catalog.search import search_products
-                items = search_products(species, format_, life_stage, exclude_ids, limit=limit)
-
-                resp = _ok({"items": items, "next_cursor": None}, request_id)
-
+                resp = match.route.handler(req)
             except ValueError as ve:
-                resp = error_response(
-                    code="BAD_REQUEST",
-                    message=str(ve),
-                    request_id=request_id,
-                    status_code=400,
-                )
-
-        elif method == "POST" and path.endswith("/admin/migrate"):
-            try:
-                admin_key = (headers or {}).get("x-admin-key")
-                if admin_key != os.environ.get("ADMIN_KEY"):
-                    resp = error_response(
-                        code="FORBIDDEN",
-                        message="Not authorized.",
-                        request_id=request_id,
-                        status_code=403,
-                    )
-                else:
-                    from pathlib import Path
-                    from app.db import get_conn
-                    from app.ingredients.resolve import load_rules, resolve_to_canonical
-
-                    # 1) Apply migration SQL
-                    sql = Path("db/migrations/001_add_canonical_id.sql").read_text()
-                    with get_conn() as conn:
-                        with conn.cursor() as cur:
-                            cur.execute(sql)
-                        conn.commit()
-
-                    # 2) Backfill canonical_id
-                    rules = load_rules()
-                    select_sql = """
-                        SELECT id::text, raw_text
-                        FROM product_ingredient_items
-                        WHERE canonical_id IS NULL
-                    """
-                    update_sql = """
-                        UPDATE product_ingredient_items
-                        SET canonical_id = %s::uuid
-                        WHERE id = %s::uuid
-                    """
-
-                    updated = 0
-                    with get_conn() as conn:
-                        with conn.cursor() as cur:
-                            cur.execute(select_sql)
-                            rows = cur.fetchall()
-                            for item_id, raw_text in rows:
-                                matched = resolve_to_canonical(raw_text, rules)
-                                if matched:
-                                    canonical_id, _ = matched
-                                    cur.execute(update_sql, (canonical_id, item_id))
-                                    updated += 1
-                        conn.commit()
-
-                    resp = _ok({"ok": True, "backfilled": updated}, request_id)
-
-            except Exception as e:
-                resp = error_response(
-                    code="MIGRATION_FAILED",
-                    message=str(e),
-                    request_id=request_id,
-                    status_code=500,
-                )
-
+                resp = _bad_request(str(ve), request_id)
+        elif match.allowed:
+            resp = error_response(
+                code="METHOD_NOT_ALLOWED",
+                message="Method not allowed.",
+                request_id=request_id,
+                status_code=405,
+                details=[{
+                    "field": "method",
+                    "issue": f"{path} supports {', '.join(match.allowed)}",
+                }],
+            )
+            resp["headers"]["allow"] = ", ".join(match.allowed)
         else:
             resp = error_response(
                 code="NOT_FOUND",
@@ -214,6 +625,11 @@ def handle_request(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 details=[{"field": "path", "issue": f"No route for {method} {path}"}],
             )
 
+        latency_ms = elapsed_ms(start)
+        if route_name:
+            incr(f"route.{route_name}.count")
+            incr(f"route.{route_name}.ms", latency_ms)
+
         log_json(
             "INFO",
             SERVICE_NAME,
@@ -222,8 +638,12 @@ def handle_request(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             "request_end",
             method=method,
             path=path,
+            route=route_name,
             status=resp.get("statusCode"),
-            latency_ms=elapsed_ms(start),
+            latency_ms=latency_ms,
+            db_pool=get_counters("db_pool."),
+            response_cache=RESPONSE_CACHE.stats(),
+            compare_cache=COMPARE_CACHE.stats(),
         )
         return resp
 
@@ -1,9 +1,12 @@
-import json
+import threading
 import time
 import uuid
+from collections import defaultdict
 from datetime import datetime, timezone
 from typing import Any, Dict, Tuple, Optional
 
+from app.serialization import dumps
+
 
 def now_iso() -> str:
     return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
@@ -15,7 +18,9 @@ def get_request_id(headers: Optional[Dict[str, str]], aws_request_id: str) -> st
     if rid:
         return rid
     # Fall back to Lambda request id for correlation if client did not send one
-    return str(uuid.UUID(aws_request_id.replace("-", "")[:32])) if _looks_like_uuidish(aws_request_id) else aws_request_id
+    if _looks_like_uuidish(aws_request_id):
+        return str(uuid.UUID(aws_request_id.replace("-", "")[:32]))
+    return aws_request_id
 
 
 def _looks_like_uuidish(s: str) -> bool:
@@ -23,7 +28,8 @@ def _looks_like_uuidish(s: str) -> bool:
     return len(s) >= 32
 
 
-def log_json(level: str, service: str, env: str, request_id: str, message: str, **fields: Any) -> None:
+def log_json(level: str, service: str, env: str, request_id: str, message: str,
+             **fields: Any) -> None:
     payload = {
         "timestamp": now_iso(),
         "level": level,
@@ -33,7 +39,7 @@ def log_json(level: str, service: str, env: str, request_id: str, message: str,
         "message": message,
         **fields,
     }
-    print(json.dumps(payload, ensure_ascii=False))
+    print(dumps(payload))
 
 
 def timed() -> Tuple[float, float]:
@@ -43,3 +49,19 @@ def timed() -> Tuple[float, float]:
 
 def elapsed_ms(start: float) -> int:
     return int((time.perf_counter() - start) * 1000)
+
+
+# Process-wide counters. They live as long as the Lambda container, so values are
+# cumulative across warm invocations.
+_COUNTERS: Dict[str, float] = defaultdict(float)
+_COUNTERS_LOCK = threading.Lock()
+
+
+def incr(name: str, value: float = 1) -> None:
+    with _COUNTERS_LOCK:
+        _COUNTERS[name] += value
+
+
+def get_counters(prefix: str = "") -> Dict[str, float]:
+    with _COUNTERS_LOCK:
+        return {k: v for k, v in _COUNTERS.items() if k.startswith(prefix)}
@@ -0,0 +1,177 @@
+import re
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.serialization import loads
+
+_PARAM_RE = re.compile(r"^\{(\w+)(?::(\w+))?\}$")
+
+
+def _uuid(value: str) -> str:
+    # Normalized form; raises ValueError on anything that is not a UUID
+    return str(uuid.UUID(value))
+
+
+# Path parameter types: {name} is str, {name:int}, {name:uuid}
+CONVERTERS: Dict[str, Callable[[str], Any]] = {
+    "str": str,
+    "int": int,
+    "uuid": _uuid,
+}
+
+
+@dataclass
+class Route:
+    method: str
+    pattern: str
+    handler: Callable[..., Any]
+    name: str
+    # Literal segments are str; parameters are (name, converter)
+    segments: Tuple[Any, ...] = ()
+
+
+@dataclass
+class Match:
+    route: Optional[Route] = None
+    params: Dict[str, Any] = field(default_factory=dict)
+    # Set when the path exists but not for this method (-> 405)
+    allowed: List[str] = field(default_factory=list)
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    headers: Dict[str, str]
+    query: Dict[str, str]
+    request_id: str
+    event: Dict[str, Any]
+    context: Any
+    params: Dict[str, Any] = field(default_factory=dict)
+
+    def json(self) -> Dict[str, Any]:
+        body = self.event.get("body") or "{}"
+        return loads(body) if isinstance(body, str) else body
+
+
+def split_path(path: str) -> Tuple[str, ...]:
+    parts = path.strip("/").split("/")
+    if "" in parts:
+        parts = [p for p in parts if p]
+    return tuple(parts)
+
+
+class _Node:
+    __slots__ = ("literals", "params", "routes")
+
+    def __init__(self):
+        self.literals: Dict[str, "_Node"] = {}
+        # (name, converter, child) for parameter segments
+        self.params: List[Tuple[str, Callable[[str], Any], "_Node"]] = []
+        # method -> route, for nodes where a pattern ends
+        self.routes: Dict[str, Route] = {}
+
+
+class Router:
+    """
+    Route table compiled at registration time. Paths without parameters are a
+    single dict lookup; parameterized ones walk a segment trie, where a literal
+    segment takes precedence over a parameter at the same position.
+    """
+
+    def __init__(self, base_path: str = ""):
+        self.base_path = split_path(base_path)
+        self.routes: List[Route] = []
+        # path segments -> {method: route}
+        self._static: Dict[Tuple[str, ...], Dict[str, Route]] = {}
+        # Segment trie for routes with parameters
+        self._root = _Node()
+
+    def add(self, method: str, pattern: str, handler: Callable[..., Any],
+            name: Optional[str] = None) -> Route:
+        segments = []
+        for seg in split_path(pattern):
+            m = _PARAM_RE.match(seg)
+            if m:
+                kind = m.group(2) or "str"
+                if kind not in CONVERTERS:
+                    raise ValueError(f"unknown path parameter type {kind!r} in {pattern}")
+                segments.append((m.group(1), CONVERTERS[kind]))
+            else:
+                segments.append(seg)
+
+        route = Route(method.upper(), pattern, handler, name or handler.__name__.strip("_"),
+                      tuple(segments))
+        self.routes.append(route)
+        if all(isinstance(s, str) for s in segments):
+            self._static.setdefault(tuple(segments), {})[route.method] = route
+            return route
+
+        node = self._root
+        for seg in segments:
+            if isinstance(seg, str):
+                node = node.literals.setdefault(seg, _Node())
+                continue
+            for name, convert, child in node.params:
+                if name == seg[0] and convert is seg[1]:
+                    node = child
+                    break
+            else:
+                child = _Node()
+                node.params.append((seg[0], seg[1], child))
+                node = child
+        node.routes[route.method] = route
+        return route
+
+    def route(self, *methods: str, pattern: str, name: Optional[str] = None):
+        def register(handler):
+            for method in methods:
+                self.add(method, pattern, handler, name)
+            return handler
+        return register
+
+    def match(self, method: str, path: str) -> Match:
+        parts = split_path(path)
+        n = len(self.base_path)
+        if n and parts[:n] == self.base_path:
+            parts = parts[n:]
+
+        allowed: List[str] = []
+        by_method = self._static.get(parts)
+        if by_method is not None:
+            route = by_method.get(method)
+            if route is not None:
+                return Match(route)
+            allowed.extend(by_method)
+
+        found = self._find(self._root, parts, 0, method, {}, allowed)
+        if found is not None:
+            return Match(found[0], found[1])
+        return Match(allowed=sorted(set(allowed)))
+
+    def _find(self, node: _Node, parts: Tuple[str, ...], i: int, method: str,
+              params: Dict[str, Any], allowed: List[str]) -> Optional[Tuple[Route, Dict[str, Any]]]:
+        # Depth-first, literal child before parameters; methods of paths that
+        # match but lack `method` are collected into `allowed`
+        if i == len(parts):
+            route = node.routes.get(method)
+            if route is not None:
+                return route, params
+            allowed.extend(node.routes)
+            return None
+        part = parts[i]
+        child = node.literals.get(part)
+        if child is not None:
+            found = self._find(child, parts, i + 1, method, params, allowed)
+            if found is not None:
+                return found
+        for name, convert, child in node.params:
+            try:
+                value = convert(part)
+            except ValueError:
+                continue
+            found = self._find(child, parts, i + 1, method, {**params, name: value}, allowed)
+            if found is not None:
+                return found
+        return None
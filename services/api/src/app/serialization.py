@@ -0,0 +1,60 @@
+import json
+import os
+import uuid
+from datetime import date, datetime
+from typing import Any, Callable, Union
+
+try:
+    import orjson
+except ImportError:  # bundled by scripts/build_lambda.sh; the fallback emits the same documents
+    orjson = None
+
+# "orjson" (default when installed) or "json"
+JSON_BACKEND = os.getenv("JSON_BACKEND", "orjson" if orjson is not None else "json")
+
+
+def _default(value: Any) -> Any:
+    # The types rows hand us that stdlib json can't encode; orjson does these natively
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+# Built once: json.dumps() with non-default arguments makes a new encoder per call.
+# Compact separators match orjson, so both backends emit the same bytes.
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=_default)
+
+
+def _stdlib_dumps_bytes(value: Any) -> bytes:
+    return _ENCODER.encode(value).encode()
+
+
+def _orjson_dumps(value: Any) -> str:
+    return orjson.dumps(value).decode()
+
+
+dumps_bytes: Callable[[Any], bytes]
+dumps: Callable[[Any], str]
+if JSON_BACKEND == "orjson" and orjson is not None:
+    dumps_bytes = orjson.dumps
+    dumps = _orjson_dumps
+else:
+    JSON_BACKEND = "json"
+    dumps_bytes = _stdlib_dumps_bytes
+    dumps = _ENCODER.encode
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    # Either way a malformed document raises a ValueError subclass
+    if JSON_BACKEND == "orjson":
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps_canonical(value: Any) -> bytes:
+    """Sorted keys, and str() for anything else the backend can't encode: for hashing."""
+    if JSON_BACKEND == "orjson":
+        return orjson.dumps(value, default=str, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str).encode()